@@ -0,0 +1,222 @@
+"""Online backups and rotated snapshots of the store database.
+
+    python backup.py DEST [--db retail_management.db] [--pages 1024]
+    python backup.py --snapshot-dir DIR [--keep 24] [--interval 60]
+
+backup() copies the live database with the sqlite3 backup API, ``pages``
+pages per step, from a pooled connection.  Between steps it holds no lock,
+so registers keep selling; a write from another connection makes SQLite
+restart the copy, and after MAX_RESTARTS the rest is taken in a single
+step (one read transaction, which under WAL still does not block writers).
+The copy is written to ``DEST.part`` and renamed into place when complete,
+so DEST is never a half-written file.  The ledger archive, when there is
+one, is copied alongside as ``<DEST>_archive.db``.
+
+snapshot() writes a timestamped backup into a directory and deletes all but
+the newest ``keep``; SnapshotScheduler takes one every ``interval`` minutes
+on a background thread.
+"""
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import db
+import ledger
+
+DEFAULT_PAGES = 1024
+# Pause after each step, letting writers in under a rollback journal.
+STEP_PAUSE = 0.001
+MAX_RESTARTS = 3
+DEFAULT_KEEP = 24
+DEFAULT_INTERVAL = 60
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _copy(conn, dest, name, pages, pause):
+    """Back up schema ``name`` of conn into dest; returns (pages, steps, restarts)."""
+    part = dest + '.part'
+    if os.path.exists(part):
+        os.remove(part)
+    state = {'steps': 0, 'restarts': 0, 'remaining': None, 'total': 0}
+
+    def progress(status, remaining, total):
+        state['steps'] += 1
+        state['total'] = total
+        # A step that leaves no fewer pages to go was restarted by a write.
+        if state['remaining'] is not None and remaining >= state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > MAX_RESTARTS:
+                raise _Restarted()
+        state['remaining'] = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    target = sqlite3.connect(part)
+    try:
+        try:
+            conn.backup(target, pages=pages, progress=progress, name=name)
+        except _Restarted:
+            conn.backup(target, pages=-1, name=name)
+            state['steps'] += 1
+            state['total'] = target.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+    os.replace(part, dest)
+    return state['total'], state['steps'], state['restarts']
+
+
+def archive_dest(dest):
+    root, ext = os.path.splitext(dest)
+    return f'{root}_archive{ext or ".db"}'
+
+
+def backup(dest, pages=DEFAULT_PAGES, pause=STEP_PAUSE):
+    """Copy the configured database to dest while it stays in use.
+
+    Returns a report dict: files written, pages, bytes, seconds, pages/sec,
+    steps and restarts.
+    """
+    started = time.perf_counter()
+    report = {'files': [], 'pages': 0, 'bytes': 0, 'steps': 0, 'restarts': 0}
+    with db.connection() as conn:
+        jobs = [('main', dest)]
+        if os.path.exists(ledger.archive_path(conn)):
+            ledger.attach_archive(conn)
+            jobs.append((ledger.ARCHIVE, archive_dest(dest)))
+        for name, path in jobs:
+            copied, steps, restarts = _copy(conn, path, name, pages, pause)
+            report['files'].append(path)
+            report['pages'] += copied
+            report['bytes'] += os.path.getsize(path)
+            report['steps'] += steps
+            report['restarts'] += restarts
+    report['seconds'] = time.perf_counter() - started
+    report['pages_per_sec'] = report['pages'] / report['seconds'] if report['seconds'] else 0
+    return report
+
+
+def _snapshot_pattern(prefix):
+    return re.compile(re.escape(prefix) + r'-\d{8}-\d{6}\.db$')
+
+
+def _db_prefix():
+    with db.connection() as conn:
+        main_file = conn.execute(
+            "SELECT file FROM pragma_database_list WHERE name = 'main'").fetchone()[0]
+    return os.path.splitext(os.path.basename(main_file))[0]
+
+
+def snapshots(directory, prefix=None):
+    """Snapshot files of the configured database in directory, oldest first."""
+    pattern = _snapshot_pattern(prefix or _db_prefix())
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if pattern.match(name))
+
+
+def prune(directory, keep=DEFAULT_KEEP, prefix=None):
+    """Delete all but the newest keep snapshots; returns the paths removed."""
+    removed = []
+    existing = snapshots(directory, prefix)
+    for path in existing[:max(len(existing) - keep, 0)]:
+        for file in (path, archive_dest(path)):
+            if os.path.exists(file):
+                os.remove(file)
+        removed.append(path)
+    return removed
+
+
+def snapshot(directory, keep=DEFAULT_KEEP, pages=DEFAULT_PAGES, pause=STEP_PAUSE):
+    """Back up into a new timestamped file in directory, then rotate old ones."""
+    os.makedirs(directory, exist_ok=True)
+    prefix = _db_prefix()
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d-%H%M%S')
+    report = backup(os.path.join(directory, f'{prefix}-{stamp}.db'), pages, pause)
+    report['removed'] = prune(directory, keep, prefix)
+    return report
+
+
+class SnapshotScheduler(threading.Thread):
+    """Takes a snapshot every ``interval`` minutes until stopped.
+
+    The first one is taken one interval after start(), so startup is not
+    held up.  ``last`` and ``last_error`` keep the outcome of the latest run;
+    on_snapshot(report) and on_error(exception) are called on this thread.
+    """
+
+    def __init__(self, directory, interval=DEFAULT_INTERVAL, keep=DEFAULT_KEEP,
+                 on_snapshot=None, on_error=None):
+        super().__init__(name='db-snapshots', daemon=True)
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.directory = directory
+        self.interval = interval * 60
+        self.keep = keep
+        self.on_snapshot = on_snapshot
+        self.on_error = on_error
+        self.last = None
+        self.last_error = None
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.last = snapshot(self.directory, self.keep)
+            except Exception as e:
+                self.last_error = e
+                if self.on_error:
+                    self.on_error(e)
+                continue
+            self.last_error = None
+            if self.on_snapshot:
+                self.on_snapshot(self.last)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self.join(timeout)
+
+
+def format_report(report):
+    return (f"Backed up {report['pages']:,} pages ({report['bytes'] / 2 ** 20:.1f} MiB) "
+            f"in {report['seconds']:.2f}s: {report['pages_per_sec']:,.0f} pages/sec, "
+            f"{report['steps']} steps, {report['restarts']} restarts")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Back up a retail database while it is in use.')
+    parser.add_argument('dest', nargs='?', help='backup file to write')
+    parser.add_argument('--db', default=db.DEFAULT_DB_NAME)
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES, help='pages copied per step')
+    parser.add_argument('--snapshot-dir', help='write rotated, timestamped snapshots here')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP, help='snapshots to keep')
+    parser.add_argument('--interval', type=float,
+                        help='minutes between snapshots; without it, take one and exit')
+    args = parser.parse_args()
+    if bool(args.dest) == bool(args.snapshot_dir):
+        parser.error('give either DEST or --snapshot-dir')
+    db.configure(args.db, size=1)
+    if args.dest:
+        print(format_report(backup(args.dest, args.pages)))
+    elif args.interval is None:
+        print(format_report(snapshot(args.snapshot_dir, args.keep, args.pages)))
+    else:
+        scheduler = SnapshotScheduler(args.snapshot_dir, args.interval, args.keep,
+                                      on_snapshot=lambda report: print(format_report(report),
+                                                                       flush=True),
+                                      on_error=lambda e: print(f"Snapshot failed: {e}",
+                                                               file=sys.stderr, flush=True))
+        scheduler.start()
+        try:
+            scheduler.join()
+        except KeyboardInterrupt:
+            scheduler.stop()
+    db.close_pool()
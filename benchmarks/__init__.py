@@ -0,0 +1,6 @@
+"""Performance benchmarks for the retail data layer.
+
+Run a scenario from the repository root, e.g. ``python -m benchmarks.pool``.
+``python -m benchmarks.suite`` times every data function against generated
+data and can compare the results with a stored baseline.
+"""
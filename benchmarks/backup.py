@@ -0,0 +1,82 @@
+"""Backup speed (pages/sec) and register throughput while an online backup runs.
+
+    python -m benchmarks.backup [--pages 64,1024,-1] [--registers 2] [--days 365]
+
+For each step size the store keeps selling on --registers threads while
+backup.backup() copies it; the table shows the backup's pages/sec, how
+often a sale restarted it, and the sales/sec and worst sale latency the
+registers saw, next to a run with no backup at all.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import backup
+import db
+import main
+from benchmarks.datagen import generate
+
+
+def selling(registers, products, stop):
+    """Start register threads; returns a list that fills with sale latencies."""
+    latencies = []
+
+    def register():
+        while not stop.is_set():
+            started = time.perf_counter()
+            main.process_sale(random.randint(1, products), 1)
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=register) for _ in range(registers)]
+    for thread in threads:
+        thread.start()
+    return threads, latencies
+
+
+def run(pages_list, registers, products, days, sales_per_day, baseline_s=2.0):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, 'bench.db'), size=registers + 1)
+        main.create_database()
+        generate(products, days, sales_per_day)
+        print(f"{'pages/step':>11}{'pages/sec':>12}{'seconds':>9}{'restarts':>10}"
+              f"{'sales/sec':>11}{'worst sale ms':>15}")
+        results = []
+        for pages in [None] + pages_list:
+            stop = threading.Event()
+            threads, latencies = selling(registers, products, stop)
+            started = time.perf_counter()
+            if pages is None:
+                time.sleep(baseline_s)
+            else:
+                report = backup.backup(os.path.join(tmp, f'backup{pages}.db'), pages)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            for thread in threads:
+                thread.join()
+            rate = len(latencies) / elapsed
+            worst = max(latencies, default=0) * 1000
+            if pages is None:
+                print(f"{'no backup':>11}{'-':>12}{elapsed:>9.2f}{'-':>10}"
+                      f"{rate:>11,.0f}{worst:>15.1f}")
+            else:
+                print(f"{pages:>11}{report['pages_per_sec']:>12,.0f}{report['seconds']:>9.2f}"
+                      f"{report['restarts']:>10}{rate:>11,.0f}{worst:>15.1f}")
+            results.append((pages, rate, worst))
+        db.close_pool()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', default='64,1024,-1',
+                        help='comma-separated pages per step (-1: all in one step)')
+    parser.add_argument('--registers', type=int, default=2)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--sales-per-day', type=int, default=200)
+    args = parser.parse_args()
+    run([int(p) for p in args.pages.split(',')], args.registers, args.products,
+        args.days, args.sales_per_day)
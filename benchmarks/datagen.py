@@ -0,0 +1,95 @@
+"""Synthetic catalogs and sales histories for the benchmarks.
+
+    python -m benchmarks.datagen out.db [--products 1000] [--days 365] [--sales-per-day 200] [--skew 1.0]
+
+Product popularity follows a Zipf law with exponent ``skew`` (0 sells every
+product equally; around 1 a few best sellers dominate, as in a real shop).
+Every sale is its own basket, at a random time of its day, and months
+older than ledger.HOT_MONTHS end up in partitions as they would in a
+store.  The same seed always yields the same data, so runs against a
+stored baseline compare like with like.
+"""
+import argparse
+import datetime
+import itertools
+import random
+import time
+
+import db
+import ledger
+import main
+from catalog import catalog
+
+CHUNK = 10000
+
+
+def product_weights(products, skew):
+    return list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, products + 1)))
+
+
+def generate(products=1000, days=365, sales_per_day=200, skew=1.0, seed=0):
+    """Fill the configured database (already created) and return the cumulative
+    product weights, for callers that want to keep drawing with the same skew."""
+    rng = random.Random(seed)
+    weights = product_weights(products, skew)
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    with db.connection() as conn:
+        first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM products').fetchone()[0] + 1
+        conn.executemany('''
+            INSERT INTO products (name, price, quantity)
+            VALUES (?, ?, ?)
+        ''', ((f'Product {first_id + i}', round(rng.uniform(0.5, 100), 2), 10 ** 9)
+              for i in range(products)))
+        prices = dict(conn.execute('SELECT id, price FROM products WHERE id >= ?', (first_id,)))
+        conn.commit()
+
+        next_basket = conn.execute('SELECT COALESCE(MAX(id), 0) FROM baskets').fetchone()[0] + 1
+        for day in range(days - 1, -1, -1):
+            date = (today - datetime.timedelta(days=day)).isoformat()
+            midnight = ledger.date_ts(date)
+            span = min(86400 * 1000000, ledger.now_ts() - midnight)
+            picks = rng.choices(range(first_id, first_id + products),
+                                cum_weights=weights, k=sales_per_day)
+            # Sorted so that ids follow time, as they do at the register.
+            times = sorted(midnight + rng.randrange(span) for _ in picks)
+            for start in range(0, len(picks), CHUNK):
+                sales = []
+                for basket_id, product_id, ts in zip(itertools.count(next_basket),
+                                                     picks[start:start + CHUNK],
+                                                     times[start:start + CHUNK]):
+                    quantity = rng.randint(1, 5)
+                    sales.append((basket_id, product_id, quantity,
+                                  round(prices[product_id] * quantity, 2), date, ts))
+                next_basket += len(sales)
+                conn.executemany('''
+                    INSERT INTO baskets (id, date, lines, total_price)
+                    VALUES (?, ?, 1, ?)
+                ''', [(sale[0], date, sale[3]) for sale in sales])
+                conn.executemany('''
+                    INSERT INTO sales (basket_id, product_id, quantity_sold, total_price, date, ts)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', sales)
+            conn.commit()
+        # Benchmarks start from a quiet change log, like a long-running store.
+        conn.execute('DELETE FROM change_log')
+        conn.commit()
+    ledger.rotate()
+    catalog.invalidate()
+    return weights
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--sales-per-day', type=int, default=200)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    db.configure(args.path)
+    main.create_database()
+    started = time.perf_counter()
+    generate(args.products, args.days, args.sales_per_day, args.skew, args.seed)
+    print(f"Generated {args.products:,} products and {args.days * args.sales_per_day:,} sales "
+          f"in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,83 @@
+"""Sales/sec with each sale committing on its own vs group commit through WriteQueue.
+
+    python -m benchmarks.group_commit [--clients 1,4,16,64] [--sales 2000] [--window-ms 2]
+
+Each client is a thread selling one unit at a time, as a register would.
+The database uses the durable profile (synchronous=FULL), so every commit
+waits for the disk.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import db
+import main
+from writequeue import DEFAULT_MAX_BATCH, DEFAULT_WINDOW_MS, WriteQueue
+
+PRODUCTS = 100
+
+
+def per_call(product_id):
+    return main.process_sale(product_id, 1)
+
+
+def clients_run(clients, sales, sell):
+    failures = []
+    per_client = sales // clients
+
+    def register():
+        for _ in range(per_client):
+            success, msg = sell(random.randint(1, PRODUCTS))
+            if not success:
+                failures.append(msg)
+
+    threads = [threading.Thread(target=register) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_client * clients / (time.perf_counter() - started), failures
+
+
+def run(clients_list, sales, window_ms, max_batch):
+    print(f"{'clients':>8}{'mode':>16}{'sales/sec':>12}{'sales/commit':>14}{'failed':>8}")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for clients in clients_list:
+            # A connection per client for the per-call mode, plus the writer.
+            db.configure(os.path.join(tmp, f'bench{clients}.db'), size=clients + 1,
+                         timeout=60.0, profile='durable')
+            main.create_database()
+            for i in range(PRODUCTS):
+                main.add_product(f'Product {i}', 1.0 + i, 10 ** 9)
+
+            rate, failures = clients_run(clients, sales, per_call)
+            print(f"{clients:>8}{'per-call':>16}{rate:>12,.0f}{1:>14.1f}{len(failures):>8}")
+            results.append((clients, 'per-call', rate))
+
+            writer = WriteQueue(window_ms, max_batch)
+            writer.start()
+            rate, failures = clients_run(
+                clients, sales, lambda product_id: writer.sell(product_id, 1).result())
+            writer.stop()
+            per_commit = writer.sales / writer.batches if writer.batches else 0
+            print(f"{clients:>8}{'group commit':>16}{rate:>12,.0f}{per_commit:>14.1f}"
+                  f"{len(failures):>8}")
+            results.append((clients, 'group commit', rate))
+        db.close_pool()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='1,4,16,64',
+                        help='comma-separated concurrency levels')
+    parser.add_argument('--sales', type=int, default=2000, help='sales per run')
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    args = parser.parse_args()
+    run([int(c) for c in args.clients.split(',')], args.sales, args.window_ms, args.max_batch)
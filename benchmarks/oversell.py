@@ -0,0 +1,117 @@
+"""Multi-process stress test: concurrent registers selling scarce stock.
+
+Every worker process sells one unit at a time of a handful of products
+until it sees a stock failure.  The old read-then-write sale path is run
+alongside the guarded UPDATE used by main.process_sale; units sold beyond
+the initial stock are reported as oversold.
+
+    python -m benchmarks.oversell [--processes 8] [--stock 500]
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+import db
+import main
+
+PRODUCTS = 5
+
+
+def read_then_write_sale(conn, product_id, quantity_sold):
+    # The pre-fix implementation, kept here only as the comparison point.
+    cursor = conn.cursor()
+    cursor.execute('SELECT price, quantity FROM products WHERE id = ?', (product_id,))
+    price, current_quantity = cursor.fetchone()
+    if current_quantity < quantity_sold:
+        return False, 'Insufficient stock.'
+    cursor.execute('UPDATE products SET quantity = quantity - ? WHERE id = ?',
+                   (quantity_sold, product_id))
+    cursor.execute('''
+        INSERT INTO sales (product_id, quantity_sold, total_price, date)
+        VALUES (?, ?, ?, DATE("now"))
+    ''', (product_id, quantity_sold, price * quantity_sold))
+    conn.commit()
+    return True, 'ok'
+
+
+def register(db_name, mode, seed, start, results):
+    db.configure(db_name, size=1)
+    start.wait()
+    sold = errors = 0
+    product_id = seed % PRODUCTS + 1
+    exhausted = set()
+    conn = sqlite3.connect(db_name, timeout=30) if mode == 'read-then-write' else None
+    while len(exhausted) < PRODUCTS:
+        try:
+            if conn is not None:
+                ok, msg = read_then_write_sale(conn, product_id, 1)
+            else:
+                ok, msg = main.process_sale(product_id, 1)
+        except sqlite3.OperationalError:
+            ok, msg = False, 'locked'
+        if ok:
+            sold += 1
+        elif msg == 'Insufficient stock.':
+            exhausted.add(product_id)
+        else:
+            errors += 1
+        product_id = product_id % PRODUCTS + 1
+    results.put((sold, errors))
+
+
+def run_mode(mode, processes, stock):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        db.configure(db_name)
+        main.create_database()
+        for i in range(PRODUCTS):
+            main.add_product(f'Product {i}', 1.0, stock)
+        db.close_pool()
+
+        ctx = multiprocessing.get_context('spawn')
+        start, results = ctx.Event(), ctx.Queue()
+        workers = [ctx.Process(target=register, args=(db_name, mode, i, start, results))
+                   for i in range(processes)]
+        for w in workers:
+            w.start()
+        began = time.perf_counter()
+        start.set()
+        outcomes = [results.get() for _ in workers]
+        elapsed = time.perf_counter() - began
+        for w in workers:
+            w.join()
+
+        with sqlite3.connect(db_name) as conn:
+            units = conn.execute('SELECT COALESCE(SUM(quantity_sold), 0) FROM sales').fetchone()[0]
+            negative = conn.execute('SELECT COUNT(*) FROM products WHERE quantity < 0').fetchone()[0]
+
+    sold = sum(o[0] for o in outcomes)
+    return {
+        'mode': mode,
+        'sold': sold,
+        'oversold': units - PRODUCTS * stock,
+        'negative_stock_products': negative,
+        'errors': sum(o[1] for o in outcomes),
+        'sales_per_sec': sold / elapsed,
+    }
+
+
+def run(processes, stock):
+    results = [run_mode(mode, processes, stock)
+               for mode in ('read-then-write', 'guarded-update')]
+    print(f"{'mode':<18}{'sold':>8}{'oversold':>10}{'errors':>8}{'sales/s':>10}")
+    for r in results:
+        print(f"{r['mode']:<18}{r['sold']:>8}{r['oversold']:>10}{r['errors']:>8}"
+              f"{r['sales_per_sec']:>10.0f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--stock', type=int, default=500)
+    args = parser.parse_args()
+    run(args.processes, args.stock)
@@ -0,0 +1,70 @@
+"""Per-operation latency: fresh sqlite3.connect per call vs the pooled layer.
+
+    python -m benchmarks.pool [--ops 2000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import db
+import main
+
+
+def unpooled_get_all_products(db_name):
+    with sqlite3.connect(db_name) as conn:
+        return conn.execute('SELECT id, name, price, quantity FROM products').fetchall()
+
+
+def unpooled_process_sale(db_name, product_id, quantity_sold):
+    with sqlite3.connect(db_name) as conn:
+        cursor = conn.cursor()
+        price, _ = cursor.execute(
+            'SELECT price, quantity FROM products WHERE id = ?', (product_id,)).fetchone()
+        cursor.execute('UPDATE products SET quantity = quantity - ? WHERE id = ?',
+                       (quantity_sold, product_id))
+        cursor.execute('''
+            INSERT INTO sales (product_id, quantity_sold, total_price, date)
+            VALUES (?, ?, ?, DATE("now"))
+        ''', (product_id, quantity_sold, price * quantity_sold))
+        conn.commit()
+
+
+def timed(fn, ops):
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def run(ops):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        db.configure(db_name)
+        main.create_database()
+        for i in range(50):
+            main.add_product(f'Product {i}', 1.0 + i, 10 ** 9)
+
+        results = [
+            ('get_all_products', 'per-call connect',
+             timed(lambda i: unpooled_get_all_products(db_name), ops)),
+            ('get_all_products', 'pooled',
+             timed(lambda i: main.get_all_products(), ops)),
+            ('process_sale', 'per-call connect',
+             timed(lambda i: unpooled_process_sale(db_name, i % 50 + 1, 1), ops)),
+            ('process_sale', 'pooled',
+             timed(lambda i: main.process_sale(i % 50 + 1, 1), ops)),
+        ]
+        db.close_pool()
+
+    print(f"{'operation':<20}{'mode':<20}{'us/op':>10}")
+    for name, mode, us in results:
+        print(f"{name:<20}{mode:<20}{us:>10.1f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=2000)
+    run(parser.parse_args().ops)
@@ -0,0 +1,105 @@
+"""Report queries: sales_daily_rollup vs full scans of the sales table.
+
+    python -m benchmarks.rollup [--sales 10000000] [--products 1000] [--days 730]
+
+Generating the default 10M-row history takes a few minutes; the rollup is
+maintained by its triggers while the rows are inserted.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import db
+import main
+
+FULL_SCANS = {
+    'revenue by day': '''
+        SELECT date, SUM(quantity_sold), SUM(total_price)
+        FROM sales GROUP BY date ORDER BY date DESC
+    ''',
+    'revenue by month': '''
+        SELECT substr(date, 1, 7) AS period, SUM(quantity_sold), SUM(total_price)
+        FROM sales GROUP BY period ORDER BY period DESC
+    ''',
+    'revenue by product': '''
+        SELECT s.product_id, p.name, SUM(s.quantity_sold), SUM(s.total_price) AS revenue
+        FROM sales s LEFT JOIN products p ON p.id = s.product_id
+        GROUP BY s.product_id ORDER BY revenue DESC
+    ''',
+}
+ROLLUP_QUERIES = {
+    'revenue by day': main.get_revenue_by_day,
+    'revenue by month': main.get_revenue_by_month,
+    'revenue by product': main.get_revenue_by_product,
+}
+
+
+def generate(sales, products, days, chunk=1000000):
+    with db.connection() as conn:
+        conn.execute('''
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO products (name, price, quantity)
+            SELECT 'Product ' || i, 1 + i % 50, 1000000 FROM n
+        ''', (products,))
+        for start in range(0, sales, chunk):
+            conn.execute('''
+                WITH RECURSIVE n(i) AS (SELECT ? UNION ALL SELECT i + 1 FROM n WHERE i < ?),
+                -- Materialized so each row's random date is drawn once.
+                s AS MATERIALIZED (
+                    SELECT 1 + abs(random()) % ? AS product_id, 1 + i % 5 AS quantity_sold,
+                           (1 + i % 5) * 2.5 AS total_price,
+                           DATE('now', '-' || (abs(random()) % ?) || ' days') AS date
+                    FROM n
+                )
+                INSERT INTO sales (product_id, quantity_sold, total_price, date, ts)
+                SELECT product_id, quantity_sold, total_price, date,
+                       CAST(strftime('%s', date) AS INTEGER) * 1000000
+                       + abs(random()) % 86400000000
+                FROM s
+            ''', (start + 1, min(start + chunk, sales), products, days))
+            conn.commit()
+        conn.execute('DELETE FROM change_log')
+        conn.commit()
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(sales, products, days, repeat=3):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, 'bench.db'), profile='fast-register')
+        main.create_database()
+        started = time.perf_counter()
+        generate(sales, products, days)
+        print(f"Generated {sales:,} sales in {time.perf_counter() - started:.1f}s")
+
+        results = []
+        for name, query in FULL_SCANS.items():
+            def full_scan():
+                with db.connection() as conn:
+                    return conn.execute(query).fetchall()
+            results.append((name, timed(full_scan, repeat),
+                            timed(ROLLUP_QUERIES[name], repeat)))
+        db.close_pool()
+
+    print(f"{'report':<22}{'full scan ms':>14}{'rollup ms':>12}{'speedup':>10}")
+    for name, scan_ms, rollup_ms in results:
+        print(f"{name:<22}{scan_ms:>14.1f}{rollup_ms:>12.1f}{scan_ms / rollup_ms:>9.0f}x")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sales', type=int, default=10000000)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.sales, args.products, args.days, args.repeat)
@@ -0,0 +1,128 @@
+"""Sale latency through the HTTP API with many registers selling at once.
+
+    python -m benchmarks.server_load [--clients 1,8,32] [--sales 2000] [--url http://host:port]
+
+Without --url a server is started on a scratch database.  Each client keeps
+one keep-alive connection and posts single-line sales back to back.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import db
+import main
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: bench\r\n'
+                 f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+                 .encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def register(host, port, product_ids, sales, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(sales):
+            started = time.perf_counter()
+            status, result = await request(reader, writer, 'POST', '/sales',
+                                           {'product_id': random.choice(product_ids),
+                                            'quantity': 1})
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                failures.append(result.get('message'))
+    finally:
+        writer.close()
+
+
+async def load(host, port, clients, sales):
+    reader, writer = await asyncio.open_connection(host, port)
+    _, result = await request(reader, writer, 'GET', '/products?limit=100')
+    writer.close()
+    product_ids = [p['id'] for p in result['products']]
+    if not product_ids:
+        raise SystemExit('the server has no products to sell')
+
+    latencies, failures = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(register(host, port, product_ids, sales // clients, latencies, failures)
+                           for _ in range(clients)))
+    return time.perf_counter() - started, latencies, failures
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def start_server(tmp):
+    db_name = os.path.join(tmp, 'bench.db')
+    db.configure(db_name)
+    main.create_database()
+    for i in range(100):
+        main.add_product(f'Product {i}', 1.0 + i, 10 ** 9)
+    db.close_pool()
+    proc = subprocess.Popen([sys.executable, os.path.join(REPO, 'server.py'),
+                             '--db', db_name, '--port', '0'],
+                            cwd=tmp, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith('Serving on'):
+        proc.kill()
+        raise SystemExit('server did not start')
+    return proc, urlsplit(line.split()[-1])
+
+
+def run(clients_list, sales, url=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = None
+        if url is None:
+            proc, target = start_server(tmp)
+        else:
+            target = urlsplit(url)
+        try:
+            print(f"{'clients':>8}{'sales/sec':>12}{'p50 ms':>10}{'p99 ms':>10}{'failed':>8}")
+            results = []
+            for clients in clients_list:
+                elapsed, latencies, failures = asyncio.run(
+                    load(target.hostname, target.port, clients, sales))
+                p50 = statistics.median(latencies) * 1000
+                p99 = percentile(latencies, 0.99) * 1000
+                print(f"{clients:>8}{len(latencies) / elapsed:>12,.0f}"
+                      f"{p50:>10.2f}{p99:>10.2f}{len(failures):>8}")
+                results.append((clients, len(latencies) / elapsed, p50, p99))
+            return results
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='1,8,32',
+                        help='comma-separated concurrency levels')
+    parser.add_argument('--sales', type=int, default=2000, help='sales per level')
+    parser.add_argument('--url', help='an already running server')
+    args = parser.parse_args()
+    run([int(c) for c in args.clients.split(',')], args.sales, args.url)
@@ -0,0 +1,87 @@
+"""Cold-start time of the GUI, from interpreter launch to the first painted frame.
+
+    python -m benchmarks.startup [--runs 5] [--products 10000] [--sales 1000000]
+
+Each run is a fresh interpreter working in a scratch directory, against an
+empty database and against one seeded with the given catalog and sales
+history; tab bodies are built lazily, so the two should start alike.  Needs
+a display (use xvfb-run on a headless box).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import db
+import main
+from benchmarks.rollup import generate
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import tkinter as tk
+import main
+imported = time.perf_counter()
+root = tk.Tk()
+tk_ready = time.perf_counter()
+app = main.RetailManagementApp(root)
+built = time.perf_counter()
+root.update()
+painted = time.perf_counter()
+app.db_worker.shutdown()
+root.destroy()
+print(json.dumps({
+    'import main': imported - started,
+    'tk root': tk_ready - imported,
+    'build app': built - tk_ready,
+    'first paint': painted - built,
+    'total': painted - started,
+    'app first paint': app.timings['first paint'] / 1000,
+}))
+'''
+
+
+def run_once(cwd):
+    env = dict(os.environ, PYTHONPATH=REPO)
+    out = subprocess.run([sys.executable, '-c', CHILD], cwd=cwd, env=env,
+                         capture_output=True, text=True)
+    if out.returncode:
+        raise SystemExit(f'startup failed:\n{out.stderr.strip()}')
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def seed(cwd, products, sales):
+    db.configure(os.path.join(cwd, main.DB_NAME))
+    main.create_database()
+    if products:
+        generate(sales, products, days=365)
+    db.close_pool()
+
+
+def run(runs, products, sales):
+    results = {}
+    print(f"{'database':<10}{'phase':<17}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for label, size in (('empty', (0, 0)), ('seeded', (products, sales))):
+        with tempfile.TemporaryDirectory() as tmp:
+            seed(tmp, *size)
+            samples = [run_once(tmp) for _ in range(runs)]
+        for phase in samples[0]:
+            times = [s[phase] * 1000 for s in samples]
+            results[label, phase] = statistics.median(times)
+            print(f"{label:<10}{phase:<17}{statistics.median(times):>12.1f}"
+                  f"{min(times):>10.1f}{max(times):>10.1f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--sales', type=int, default=1000000)
+    args = parser.parse_args()
+    run(args.runs, args.products, args.sales)
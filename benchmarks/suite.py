@@ -0,0 +1,209 @@
+"""Timing suite for the main.py data layer, with JSON results and baseline comparison.
+
+    python -m benchmarks.suite [--products 1000] [--days 365] [--sales-per-day 200] [--skew 1.0]
+                               [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+
+Each scenario times one data function against a generated store (see
+benchmarks/datagen.py).  With --baseline, a scenario whose median is more
+than --threshold slower than the baseline's is reported as a regression and
+the exit status is 1.  A baseline is simply an earlier --output file from
+the same machine and data parameters.  The JSON output also carries the
+per-statement counts and times from queries.stats() over the whole run.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import db
+import main
+import queries
+from benchmarks.datagen import generate
+from catalog import catalog
+
+REPEAT = 7
+# Fast scenarios are looped until a sample takes at least this long.
+MIN_SAMPLE = 0.05
+
+
+def measure(fn, setup=None, repeat=REPEAT):
+    """Per-call times in seconds, one per sample.
+
+    With ``setup`` every sample is a single call to fn(setup()), the setup
+    untimed; otherwise calls are batched so timer resolution does not matter.
+    """
+    if setup is not None:
+        times = []
+        for _ in range(repeat):
+            arg = setup()
+            started = time.perf_counter()
+            fn(arg)
+            times.append(time.perf_counter() - started)
+        return times
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_SAMPLE:
+            break
+        number *= 10 if elapsed * 10 < MIN_SAMPLE else 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / number)
+    return times
+
+
+def last_days(days):
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    return (today - datetime.timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+
+def scenarios(products, weights, seed):
+    """(name, fn, setup) for each scenario run against the generated store."""
+    rng = random.Random(seed)
+    names = itertools.count()
+    product_ids = range(1, products + 1)
+
+    def popular_product():
+        return rng.choices(product_ids, cum_weights=weights)[0]
+
+    def cold_catalog():
+        catalog.invalidate()
+
+    return [
+        ('add_product', lambda: main.add_product(f'Bench product {next(names)}', 9.99, 100), None),
+        ('process_sale', lambda: main.process_sale(popular_product(), 1), None),
+        ('get_product', lambda: main.get_product(popular_product()), None),
+        ('get_all_products', main.get_all_products, None),
+        ('get_all_products (cold cache)', lambda _: main.get_all_products(), cold_catalog),
+        ('search_products', lambda: main.search_products('Product 1'), None),
+        ('get_sales_page', main.get_sales_page, None),
+        ('get_all_sales', main.get_all_sales, None),
+        ('get_sales_summary (30 days)', lambda: main.get_sales_summary(*last_days(30)), None),
+        ('get_revenue_by_product', main.get_revenue_by_product, None),
+    ]
+
+
+def summarize(times):
+    times = sorted(t * 1000 for t in times)
+    return {
+        'median_ms': statistics.median(times),
+        'min_ms': times[0],
+        'max_ms': times[-1],
+        'samples': len(times),
+    }
+
+
+def run(products, days, sales_per_day, skew, seed=0, repeat=REPEAT):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Schema plus every migration on an empty file.
+        fresh = itertools.count()
+
+        def create_database(path):
+            db.configure(path)
+            main.create_database()
+
+        results['create_database'] = summarize(measure(
+            create_database, lambda: os.path.join(tmp, f'fresh{next(fresh)}.db'), repeat))
+
+        db.configure(os.path.join(tmp, 'bench.db'))
+        main.create_database()
+        started = time.perf_counter()
+        weights = generate(products, days, sales_per_day, skew, seed)
+        generated = time.perf_counter() - started
+
+        queries.reset()
+        for name, fn, setup in scenarios(products, weights, seed):
+            results[name] = summarize(measure(fn, setup, repeat))
+        statements = queries.stats()
+        db.close_pool()
+
+    return {
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'data': {'products': products, 'days': days, 'sales_per_day': sales_per_day,
+                     'skew': skew, 'seed': seed},
+            'generate_s': generated,
+        },
+        'results': results,
+        'statements': statements,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print each scenario against the baseline; returns the regressed names."""
+    regressions = []
+    if baseline['meta'].get('data') != report['meta']['data']:
+        print("Warning: baseline was recorded with different data parameters", file=sys.stderr)
+    print(f"{'scenario':<32}{'baseline ms':>13}{'now ms':>11}{'change':>9}")
+    for name, result in report['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<32}{'-':>13}{result['median_ms']:>11.3f}{'new':>9}")
+            continue
+        change = result['median_ms'] / before['median_ms'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<32}{before['median_ms']:>13.3f}{result['median_ms']:>11.3f}"
+              f"{change:>+9.0%}{flag}")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'scenario':<32}{'median ms':>11}{'min ms':>10}{'max ms':>10}")
+    for name, result in report['results'].items():
+        print(f"{name:<32}{result['median_ms']:>11.3f}{result['min_ms']:>10.3f}"
+              f"{result['max_ms']:>10.3f}")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--sales-per-day', type=int, default=200)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown that counts as a regression (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    report = run(args.products, args.days, args.sales_per_day, args.skew, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not args.baseline:
+        print_report(report)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,82 @@
+"""Sale throughput under concurrent report readers, per PRAGMA profile.
+
+    python -m benchmarks.wal [--seconds 3] [--writers 2] [--readers 4]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import db
+import main
+
+
+def run_profile(profile, seconds, writers, readers):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.configure(os.path.join(tmp, 'bench.db'), size=writers + readers,
+                     profile=profile)
+        main.create_database()
+        for i in range(50):
+            main.add_product(f'Product {i}', 1.0 + i, 10 ** 9)
+        for i in range(2000):
+            main.process_sale(i % 50 + 1, 1)
+
+        stop = threading.Event()
+        counts = {'sales': 0, 'failed': 0, 'reads': 0}
+        lock = threading.Lock()
+
+        def writer(seed):
+            n = failed = 0
+            while not stop.is_set():
+                ok, _ = main.process_sale((n + seed) % 50 + 1, 1)
+                n += 1
+                failed += not ok
+            with lock:
+                counts['sales'] += n - failed
+                counts['failed'] += failed
+
+        def reader():
+            n = 0
+            while not stop.is_set():
+                main.get_all_sales()
+                n += 1
+            with lock:
+                counts['reads'] += n
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        db.close_pool()
+
+    return {
+        'profile': profile,
+        'sales_per_sec': counts['sales'] / seconds,
+        'failed': counts['failed'],
+        'reads_per_sec': counts['reads'] / seconds,
+    }
+
+
+def run(seconds, writers, readers, profiles=None):
+    results = [run_profile(p, seconds, writers, readers)
+               for p in profiles or db.PRAGMA_PROFILES]
+    print(f"{'profile':<16}{'sales/s':>10}{'failed':>8}{'reads/s':>10}")
+    for r in results:
+        print(f"{r['profile']:<16}{r['sales_per_sec']:>10.0f}{r['failed']:>8}"
+              f"{r['reads_per_sec']:>10.0f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--profile', action='append', choices=list(db.PRAGMA_PROFILES))
+    args = parser.parse_args()
+    run(args.seconds, args.writers, args.readers, args.profile)
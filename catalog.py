@@ -0,0 +1,205 @@
+"""Process-wide in-memory cache of the products table.
+
+The data functions in main.py update the cache as they write (write-through).
+Changes made by other processes are noticed through ``PRAGMA data_version``
+on a dedicated connection: when it moves, the products rows listed in
+change_log since the cache was last synced are re-read, or the whole
+cache is reloaded if too much changed.
+
+Products are also indexed by name and by SKU / barcode, so lookups from the
+Point of Sale scan field are a dict hit.
+"""
+import sqlite3
+import threading
+
+import db
+
+# Past this many pending product changes a full reload is cheaper.
+MAX_SYNC_CHANGES = 1000
+
+
+class ProductCatalog:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pool = None
+        self._conn = None
+        self._products = None
+        self._ids_by_name = {}
+        self._ids_by_sku = {}
+        self._skus = {}
+        self._seq = 0
+        self._data_version = None
+        self.hits = 0
+        self.misses = 0
+        self.syncs = 0
+        self.reloads = 0
+
+    # Reads
+    def all(self):
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._products.values())
+
+    def get(self, product_id):
+        with self._lock:
+            self._ensure_fresh()
+            return self._products.get(product_id)
+
+    def get_many(self, product_ids):
+        with self._lock:
+            self._ensure_fresh()
+            return [self._products[i] for i in product_ids if i in self._products]
+
+    def by_name(self, name):
+        with self._lock:
+            self._ensure_fresh()
+            product_id = self._ids_by_name.get(name)
+            return self._products.get(product_id)
+
+    def by_sku(self, code):
+        with self._lock:
+            self._ensure_fresh()
+            product_id = self._ids_by_sku.get(code)
+            return self._products.get(product_id)
+
+    def count(self):
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._products)
+
+    # Write-through; no-ops until the cache has been loaded.
+    def put(self, product, sku=None):
+        with self._lock:
+            if self._products is None:
+                return
+            old = self._products.get(product[0])
+            if old is not None and old[1] != product[1]:
+                self._ids_by_name.pop(old[1], None)
+            self._products[product[0]] = tuple(product)
+            self._ids_by_name[product[1]] = product[0]
+            self._set_sku(product[0], sku)
+
+    def remove(self, product_id):
+        with self._lock:
+            if self._products is None:
+                return
+            old = self._products.pop(product_id, None)
+            if old is not None:
+                self._ids_by_name.pop(old[1], None)
+            self._set_sku(product_id, None)
+
+    def set_quantity(self, product_id, quantity):
+        with self._lock:
+            product = self._products.get(product_id) if self._products is not None else None
+            if product is not None:
+                self._products[product_id] = (*product[:3], quantity)
+
+    def invalidate(self):
+        with self._lock:
+            self._products = None
+            self._ids_by_name = {}
+            self._ids_by_sku = {}
+            self._skus = {}
+
+    def close(self):
+        with self._lock:
+            self.invalidate()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._pool = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'syncs': self.syncs,
+                'reloads': self.reloads,
+                'size': len(self._products) if self._products is not None else 0,
+            }
+
+    def _set_sku(self, product_id, sku):
+        old = self._skus.pop(product_id, None)
+        if old is not None and self._ids_by_sku.get(old) == product_id:
+            del self._ids_by_sku[old]
+        if sku is not None:
+            self._skus[product_id] = sku
+            self._ids_by_sku[sku] = product_id
+
+    # Freshness
+    def _connection(self):
+        pool = db.get_pool()
+        if pool is not self._pool:
+            # db.configure() pointed the app at another database.
+            self.close()
+            self._pool = pool
+            self._conn = sqlite3.connect(pool.db_name, timeout=pool.timeout,
+                                         check_same_thread=False)
+        return self._conn
+
+    def _ensure_fresh(self):
+        conn = self._connection()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if self._products is None:
+            self.misses += 1
+            self._reload(conn)
+        elif version != self._data_version:
+            self.misses += 1
+            self._sync(conn)
+        else:
+            self.hits += 1
+        self._data_version = version
+
+    def _reload(self, conn):
+        self.reloads += 1
+        with conn:
+            conn.execute('BEGIN')
+            self._seq = conn.execute(
+                'SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+            rows = conn.execute(
+                'SELECT id, name, price, quantity, sku FROM products ORDER BY id').fetchall()
+        self._products = {row[0]: row[:4] for row in rows}
+        self._ids_by_name = {row[1]: row[0] for row in rows}
+        self._skus = {row[0]: row[4] for row in rows if row[4] is not None}
+        self._ids_by_sku = {sku: product_id for product_id, sku in self._skus.items()}
+
+    def _sync(self, conn):
+        self.syncs += 1
+        with conn:
+            conn.execute('BEGIN')
+            changes = conn.execute('''
+                SELECT seq, row_id, op
+                FROM change_log
+                WHERE seq > ? AND table_name = 'products'
+                ORDER BY seq
+                LIMIT ?
+            ''', (self._seq, MAX_SYNC_CHANGES + 1)).fetchall()
+            oldest = conn.execute('SELECT MIN(seq) FROM change_log').fetchone()[0]
+            if len(changes) > MAX_SYNC_CHANGES or (oldest is not None and oldest > self._seq + 1):
+                changes = None
+            else:
+                changed_ids = sorted({row_id for _, row_id, _ in changes})
+                rows = []
+                for i in range(0, len(changed_ids), 500):
+                    chunk = changed_ids[i:i + 500]
+                    placeholders = ', '.join('?' * len(chunk))
+                    rows.extend(conn.execute(f'''
+                        SELECT id, name, price, quantity, sku
+                        FROM products
+                        WHERE id IN ({placeholders})
+                    ''', chunk))
+                self._seq = max([self._seq] + [seq for seq, _, _ in changes])
+        if changes is None:
+            self._reload(conn)
+            return
+        current = {row[0]: row for row in rows}
+        for product_id in changed_ids:
+            if product_id in current:
+                row = current[product_id]
+                self.put(row[:4], sku=row[4])
+            else:
+                self.remove(product_id)
+
+
+catalog = ProductCatalog()
@@ -0,0 +1,261 @@
+"""Pooled, long-lived SQLite connections shared by the data layer."""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_NAME = 'retail_management.db'
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 5.0
+# Per-connection prepared statement cache: room for every statement named in
+# queries.py plus the queries built per call (IN lists of different lengths,
+# ledger unions), so pooled connections keep the hot ones compiled.
+CACHED_STATEMENTS = 256
+
+# PRAGMA settings applied to every pooled connection.  Pick one per
+# deployment with configure(profile=...) or the RETAIL_DB_PROFILE variable.
+PRAGMA_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+    },
+    'fast-register': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # The pre-WAL behaviour, kept for comparison benchmarks.
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+}
+DEFAULT_PROFILE = os.environ.get('RETAIL_DB_PROFILE', 'durable')
+
+# journal_mode goes first: it cannot be changed inside a transaction and
+# synchronous=NORMAL is only safe once WAL is active.
+_PRAGMA_ORDER = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size',
+                 'temp_store', 'busy_timeout')
+
+
+def apply_pragmas(conn, profile):
+    if isinstance(profile, str):
+        try:
+            profile = PRAGMA_PROFILES[profile]
+        except KeyError:
+            raise ValueError(f"Unknown PRAGMA profile: {profile!r}") from None
+    names = [n for n in _PRAGMA_ORDER if n in profile]
+    names += [n for n in profile if n not in _PRAGMA_ORDER]
+    for name in names:
+        conn.execute(f'PRAGMA {name} = {profile[name]}').fetchall()
+
+
+# Called with every new pooled connection once its PRAGMAs are set, e.g. to
+# install SQLite callbacks (see profiling.py).
+_connect_hooks = []
+
+
+def add_connect_hook(hook):
+    if hook not in _connect_hooks:
+        _connect_hooks.append(hook)
+
+
+class PoolClosedError(sqlite3.InterfaceError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, db_name, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 profile=DEFAULT_PROFILE):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self.profile = profile
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout,
+                               check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        try:
+            apply_pragmas(conn, self.profile)
+            for hook in _connect_hooks:
+                hook(conn)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self):
+        while True:
+            if self._closed:
+                raise PoolClosedError("Connection pool is closed.")
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._connect()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        "Timed out waiting for a database connection.")
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        # Nested calls on the same thread share the connection already held,
+        # so a data function may call another without needing a second slot.
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        conn = self.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self.release(conn)
+
+    @contextmanager
+    def checkout(self):
+        # A connection that is not bound to the calling thread, for
+        # generators that may be suspended between rows.
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'open': self._created,
+            'idle': self._idle.qsize(),
+            'profile': self.profile,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_settings = {
+    'db_name': DEFAULT_DB_NAME,
+    'size': DEFAULT_POOL_SIZE,
+    'timeout': DEFAULT_TIMEOUT,
+    'profile': DEFAULT_PROFILE,
+}
+
+
+def configure(db_name=None, size=None, timeout=None, profile=None):
+    """Change pool settings; the current pool (if any) is shut down."""
+    global _pool
+    with _pool_lock:
+        if db_name is not None:
+            _settings['db_name'] = db_name
+        if size is not None:
+            _settings['size'] = size
+        if timeout is not None:
+            _settings['timeout'] = timeout
+        if profile is not None:
+            if isinstance(profile, str) and profile not in PRAGMA_PROFILES:
+                raise ValueError(f"Unknown PRAGMA profile: {profile!r}")
+            _settings['profile'] = profile
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ConnectionPool(_settings['db_name'], _settings['size'],
+                                   _settings['timeout'], _settings['profile'])
+        return _pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def checkout():
+    return get_pool().checkout()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+atexit.register(close_pool)
@@ -0,0 +1,108 @@
+"""Toolbar icons bundled with the app.
+
+The icons are 24x24 PNGs embedded as base64, so startup needs neither the
+network nor PIL; Tk 8.6 decodes PNG data natively.  Each PhotoImage is built
+the first time it is asked for and then reused.
+"""
+import tkinter as tk
+
+_ICON_DATA = {
+    'add': (
+        'iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAAEOklEQVR42pVWQWhcZRD+Zv7/'
+        'GRNCJSkmsuRQRUQCjW5fVnJ7BgqR2OsDQWhvvXnzUkHS2IPePYoHDxZxsTcVrYcsYpHdvDY9'
+        'ZK1tRPcgUUFqalvi7j8zHvK/8LIkhQ78PN7/z5uZN9/MfL/DEZJlme/1elq+53nujh07NjEz'
+        'MzM6PT1N29vbg+pZt9s91A49Ys/m5uamRkZGls1sGcCLZvYMAJjZfSK6xczfmdmX6+vrP8dv'
+        'GIA+ysG+Qpqm7xLRW865p80M5QIAItpfIjIA8CkRvd3pdP7O89w1m005zAED0NnZ2cmxsbHL'
+        'zrklEYGqhqhnRGSlsplx3PPee4jInRDCmxsbG52qE6o6ajQak6r6tfe+EUIYAPDlGTODmUvj'
+        'ENkP0gAE51yiqndDCEsbGxudMuDSgQNgaZp+470/HY0n0Zg651hVWwDWov4JIjpnezmjqCfO'
+        'OWdmfxHRS51O508AxFmWeQBSr9cvDBuPojHyr4qiuFgUxUUz+5CIyuhLXJyIBGaeUtVPAFie'
+        '50QAKE3T4wBuE9FTZkZVbMwsJEniQwiXxsfH3wOABw8evEpEV1VVYyqqIs45JyKLRVGs8Z4N'
+        'O+O9n1DV8pfVzIKZBQDBzAIRhVarFVqtVhg+i0tiQGUxnEMEEQBet7IG9wBljnkxM58kCXZ3'
+        'd8crUT6RJInf+wEcAD6migAsLiwsjPqFhYXRfr8/G1NjzAxVbanqGgCO0XMFYDjn7oQQVm1P'
+        'OGKxD3y0NT0YDJ6nRqNxXERuM/OkmQ2890kI4UJRFB/gMWR+fr5BRG0RESJi2quCZT5C3+Hx'
+        'JRneEBHzSZL0ReQegEkzozgSXkjTdJGInJkF5xwB+K3dbv8KACdPnpwYHR19ucy5mYmZ1Yem'
+        'w8B7v+OvXbv276lTp35i5hOqSiICZj5LRGcrOUe/338fwDsAMDIykhLR1bKzY09AVUFRzOwu'
+        'M29yVFirNo6ZmUYxs76IKBH9V+2NeFw+NfYEzEyZ2QC02+32/bJMvxCRS0TkoxOqjAAmIjYz'
+        'zvPcAcDW1pYry/iQRkME+DIA5SzLfFEUv6jqZ957BhAOJQ6i3WazKc1mU5j5/mE65TwKIWzt'
+        '7OxcWVlZYdfr9QwA12q171U1d84dV1WJtY/YGywiv9dqtZ1arfYsgFcALA2BqjH9UNUzm5ub'
+        'vampKaYqF9Tr9Xnn3LdENCEiIabsAMnsT8CDXSxExM45CiGcv379+kclJ5RRap7n7saNG+sh'
+        'hCUA2957b2YaZ46amYqIqKpEQC2WZ3DOOWaW0niWZX6YcPbJu9lsSr1erzHzx8651yItlnRp'
+        'VRyZuaTNrpmdL4rihyzLfKvVCkeS/srKCq+urmps/9MA3jCzRQA1Zn4ypseI6A8APwK48vDh'
+        'w8+73W5/mI+PulUcuFnEC8AYET1nZrWY83sicuvmzZv/HHZhqMr/mpeyNyDtZngAAAAASUVO'
+        'RK5CYII='
+    ),
+    'delete': (
+        'iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAAEn0lEQVR42n1Wz2tdRRT+zjlz'
+        'kyaExkZskpKNiiBRmuTdvhLcPIvFQl3KLYVgUdB0owvBjQsJxT/Abpt2YRdW8aFUiCgqpXFR'
+        'SpJ7kyx81h8ECkK6UGpqDfa9mXNcZG64DUkPzOKeO/N9M+ec78wI9rBGo+Fu376t5XeWZbJ/'
+        '//4DIyMjPYODg7S+vt6p/mu1Wrvi0CN8dvjw4YPd3d0nzewkgGfNbAgAzOw+Ed1i5h/M7Oul'
+        'paVf4hoGoI8i2J6QpukHRPSOiDxhZigHABDR9gghdAB8QkTvLS4u/pVlmTSbzbAbAQPQ0dHR'
+        'gd7e3isiciKEAFX1W5hE1dPZFpsRkXPOIYTwm/d+amVlZbFKQlWier0+oKrfOOfq3vsOAAfA'
+        'KhuomlbWehFJVPWu9/7EysrKYrlhriwmVf2sAp4AMI4WiUoyrfgBIPHeByI64Jybq9frQ3Eu'
+        'c6PRcADCxMTE+8654yW4mfkkSVhVz4cQ3hARiovau/iViDiE4Jn5oKpeBmBZlm3FNU3TxwH8'
+        'SkT9ZkYALEkS7nQ6F/M8nwaAWq02LSIXmBne+9k8z8+WfufcBVVFzIuKiIQQjuV5fl0AYHh4'
+        '+FSSJKdDCEpEYGao6vk8z9/Oskx6enpcURSLQ0NDG2Z2J8/zNwFwmqauKIrF4eHhNSJ62cyc'
+        'mZmIkKpifX39Kxdj+EpZFTFpZmarALC2tsZ5nncAcFEU5yuJ1b6+PgaAdru93NXV9YCIegFw'
+        'CIEAHJucnOyhycnJnna7vSQio6qqJYGIsPf+bFEUsxV9cKWCGICOj4/XkyT5HkC/qlqlMv8D'
+        'cJRDCL0AhqKIylqnEIKKyIU0Td/dIcIS3CYmJl5yzn1rZv0hBK3qhIj2EdEI79GKCEAQEQAY'
+        'y7LsIcXHbxORp0VkQFV9FOJDFkIwTpKkDeDeThElSZLEKnq92WyW+eGKSnlpaWnWe/+Wc85F'
+        'AqtgdJxzG3zjxo1/APzMzDAzjSKC9/6jPM+nZ2ZmytAQAC3BAWij0XB5nl9S1TNE9G8kUCIi'
+        'M7tLRD9xbF7X4wmt0mtWAWBubk6iGDVN0xdrtdp0CV5utd1uL5vZgwiszGwAFhYWFu6Xk74I'
+        'IXxIRC62DIjIx7VarTvP81kAGB8frxPRVedcf5qmOj8/fwkAxsbGjnZ1dX1XraIYrisAlBqN'
+        'hpufn/e1Wu1ykiRnOp2Oj0QqItzpdF5j5lUi+pGIHlPVjogkO/2xiiAirKq/b2xsPD81NdXZ'
+        'Lss0TQcALIjIk7FxMRGV8t9k5r6odNrLH5sjhRBeKIriZpZlUnZJ5Hn+p6qeUtW7IiJmFqI2'
+        'mIj6VNWIiAFQ7Ffb/hJDRDiEcLYEbzabYVuZWZbJ8vLykvf+BIB155yzLfNmFnbRiqqqN7Mg'
+        'IsLMwXs/XRTFxUaj4coLR8rZrVbLsiyTa9eu/TE4OPgpgOecc8+ICJsZly2kFCIRkYhwjHnL'
+        'zF4tiuJqmdM9L/2ZmRk+d+6cAsCRI0eOAzhtZscAHGLmfXHrRkR3ANwE8OXm5ubnrVarvfM+'
+        '3utV8dDLIj4AeonoKTM7FEVyL4Rwa3V19e/dHgxV+x85CqlpyOqqnQAAAABJRU5ErkJggg=='
+    ),
+    'sale': (
+        'iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAADd0lEQVR42tVVz2tcVRT+zrnv'
+        'vUnImBZJUGxxEaRIwOgwiYGAnUg3gpu6eKsK+i+4cuFiFrp0owhuunBVhBGycOVGffVHo+TG'
+        'koFppBARFyUaU1tn6sx7997PhW9kMp2iad144Szeuffd757vfB9HACBNU4OR1Wq1AgDi/7Ck'
+        '0WhEvV7vWQCx955xHJvp6ekrWZb1AciDVqLdbvckgK/iOP48SZJMVT/tdrtvA5A0TbUEud+A'
+        'rK2tPTQYDD4AMEsyEpHnAPQBnLLW3npgisYT9Xr9mjHmTFEUL4YQNpMkMf1+P/xrSlQZQpAk'
+        'SYK19lY0zC8uLkadTqcAsCkiT6rqh6oaysPH6YM3xhjn3McAXhkChPn5+QCAJDOSrwI4ISLH'
+        'poQkVBWq+h0ADAGQZVkAgKIorqhqDiAiKfdBO733JHkZAHRkIwAQ7/0PJPdUVUuJHkc1VFX1'
+        '3t8AsAtAdLxHnU4nB3BNRECSx6SHIgIR6Vhr76RpqkcAGo3GX9oVuVzyf1yTsfxvEwD29vaO'
+        'AqyvrwcACCF84b33ImJKkEkRSPrREBGGEALJDAAWFhaCTPAFl5aWZuI4/l5ETpHEJDWp6t2m'
+        'EoFzLu/1eo/t7u7+CkCi8RIBmJ2dnV69Xv/WGHO+KIqbJO+MX+S9vw6gO3wUyRBFkYYQ2sPL'
+        'AfCuZ4z1QUSkKyI/l7EvIvsA9gEMSA5pGirQR1H01MrKyjMA2Gw2dbwCZFnmm82mbmxsXCJ5'
+        'tlKpvFQUxeOqilJZf1cx/B7NG2PQ6/XeB3C10+nc06oCgKurq48AOO2cO+29/0VVg4hMiQgB'
+        'wHtPVVWSvwM4oaoVEbnR7/d/bLfbNyf14EgfReS2c+6CiJyP43ib5GtbW1s/jR+s1WrnjDFv'
+        'knyY5Hvtdvvq8JETK0jT1LRaLb+8vPxWkiRvDAYDJEmCPM+/Pjg4ODc3N+cBoFqt8vDw8NFK'
+        'pbJrjJnx3iOKIuR5/sL29vYnaZoanQTQarVY+uF551xOsl8URQ7g6dnZ2WlrbVGtVpllmYvj'
+        '+Iyqzjjn+iGEP0o/nJ1otJEKpNT6RWNMYoyZSpIkAfBRu93+LU1Tk2WZByDOuW+899fjOJ6K'
+        'omjae2+cc5cAwFrr5R+GkdTr9ZdV9QKAL0MI71prb494RgCwVqs9YYx5HcA8yXestZ/9F/P8'
+        'nlNxNPcnTzTX+c6FOS8AAAAASUVORK5CYII='
+    ),
+    'report': (
+        'iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAACc0lEQVR42rVVTWsTURQ9573X'
+        'aRKQJinUH1BchkIGJbuCbou7bPwPCq4FQ1y5c+EPkC6lrl25CYiLSqkL6c4W3NmChHyAfV/X'
+        'RWdCGhIz/fBuZjjMm3fuOfe8R9xucepdJkCapk+SJNm01u4eHBz8zHC5jR1V9nyqtX4VY7wH'
+        'AO12W12HfZqma41Go9ZoNGrb29sGAAwAiMhv55wnaeetzD8GgF6vF2a6IwDZ2tpaA3CYJMma'
+        'Ugqj0egxgM8GAEhqkkZEOG+DXq/nl9GPMRLAOsk7JAFgZdLBPwyTVqtVds49A1BWSoHk7v7+'
+        '/kmn01HdbjfOrHFyUROTzTJmg8GgXKlUXmutoZSCtfYLgJOjoyMuIMV5Ji8srbWIyJlzzjvn'
+        'PAB7nSm6ZOhwODRpmpopNoakIWlmGS6rSxKRlMzQiakhBN4kB2YmgZU0TZ8rpaoAxHv/Til1'
+        'Nq/T09NTTmkuSyUSEZAsi0hXa/3SGNMhubmzs/Nn3vhmnQqAWFiibMGZc65MEiTtgmlBq9Wq'
+        'j8djAYB6vT7s9/tSyOTczEXBExHfbre1tfZbkiQ/SqXS8WAwuF+tVkciopduUPjgIddJ1khW'
+        'AaxsbGxIEYmuUpPUkpTCOShamXxclguF/1xmDrMAIOTBy/MmImFGjkLYbJI1gLoxRpPE+fn5'
+        'KgBNspYfdkUx59wqAJrp+zPG2AfwIYRwl6RorU/29vZss9l8H0KoiAiKYjHGYwAXc95sNj8Z'
+        'Yx5677+S/HWhlIBkCYAWkfFUl0UwUUqVQwgv8hvtu1Lqkdb6gdZ62o/8B1fGMkXemuzlTYzx'
+        'YwjBe+9508nJ5GWSJId/AUfeUTZtiSqaAAAAAElFTkSuQmCC'
+    ),
+}
+
+_cache = {}
+
+
+def get(name):
+    """Return the PhotoImage for ``name``, or None if there is no such icon.
+
+    Needs a Tk root to exist; keep the returned image referenced (Tk drops
+    unreferenced PhotoImages), which the cache does for you.
+    """
+    image = _cache.get(name)
+    if image is None and name in _ICON_DATA:
+        image = _cache[name] = tk.PhotoImage(data=_ICON_DATA[name])
+    return image
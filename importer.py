@@ -0,0 +1,194 @@
+"""Bulk product import from CSV or JSONL.
+
+    python importer.py catalog.csv [--on-duplicate update] [--batch-size 5000]
+
+Rows need ``name``, ``price`` and ``quantity``; ``sku`` (barcode) is
+optional.  Input is streamed, rows are validated, and each batch is written
+with executemany in its own transaction.  Names that already exist (in the
+database or earlier in the file) are reported and skipped, or updated with
+``--on-duplicate update``.  A SKU already used by another product is
+reported as a duplicate too.
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+
+import db
+import main as app
+
+BATCH_SIZE = 5000
+MAX_REPORTED = 20
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.duplicates = []
+        self.invalid = []
+        self.elapsed = 0.0
+
+    @property
+    def rows(self):
+        return self.inserted + self.updated + len(self.duplicates) + len(self.invalid)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def read_rows(path, fmt=None):
+    """Yield (line number, record) pairs without loading the whole file."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = {'_error': f'invalid JSON ({e})'}
+            yield line_no, record
+
+
+def validate(record):
+    """Return (name, price, quantity, sku) or raise ValueError with the reason."""
+    if not isinstance(record, dict):
+        raise ValueError('expected an object')
+    if '_error' in record:
+        raise ValueError(record['_error'])
+    name = str(record.get('name') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    price, quantity = record.get('price'), record.get('quantity')
+    # JSON true / false would read as 1 / 0, and int() truncates 2.9 to 2.
+    if (isinstance(price, bool) or isinstance(quantity, bool)
+            or isinstance(quantity, float) and not quantity.is_integer()):
+        raise ValueError('invalid price or quantity')
+    try:
+        price = float(price)
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError('invalid price or quantity') from None
+    if not math.isfinite(price) or price <= 0 or quantity < 0:
+        raise ValueError('invalid price or quantity')
+    sku = str(record.get('sku') or '').strip() or None
+    return name, price, quantity, sku
+
+
+def _existing_ids(conn, column, values):
+    ids = {}
+    for i in range(0, len(values), app.PAGE_SIZE):
+        chunk = values[i:i + app.PAGE_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        ids.update(conn.execute(
+            f'SELECT {column}, id FROM products WHERE {column} IN ({placeholders})', chunk))
+    return ids
+
+
+def _write_batch(batch, on_duplicate, seen, seen_skus, report):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            existing = _existing_ids(conn, 'name', [row[1] for row in batch])
+            sku_owners = _existing_ids(conn, 'sku', [row[4] for row in batch if row[4]])
+            inserts, updates = [], []
+            for line_no, name, price, quantity, sku in batch:
+                if name in seen or (name in existing and on_duplicate == 'skip'):
+                    report.duplicates.append((line_no, name))
+                    continue
+                owner = sku_owners.get(sku)
+                if sku is not None and (sku in seen_skus or owner not in (None, existing.get(name))):
+                    report.duplicates.append((line_no, f'{name} (SKU {sku})'))
+                    continue
+                seen.add(name)
+                if sku is not None:
+                    seen_skus.add(sku)
+                if name in existing:
+                    updates.append((price, quantity, sku, existing[name]))
+                    continue
+                inserts.append((name, price, quantity, sku))
+            cursor.executemany('''
+                INSERT INTO products (name, price, quantity, sku)
+                VALUES (?, ?, ?, ?)
+            ''', inserts)
+            # A row without a SKU keeps the one already on file.
+            cursor.executemany('''
+                UPDATE products
+                SET price = ?, quantity = ?, sku = COALESCE(?, sku)
+                WHERE id = ?
+            ''', updates)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+
+
+def import_products(rows, batch_size=BATCH_SIZE, on_duplicate='skip'):
+    """Import (line number, record) pairs; returns an ImportReport."""
+    if on_duplicate not in ('skip', 'update'):
+        raise ValueError(f"on_duplicate must be 'skip' or 'update', not {on_duplicate!r}")
+    report = ImportReport()
+    # Names already written by this import, so repeats within the file are
+    # reported even when they fall in the same batch.
+    seen = set()
+    seen_skus = set()
+    batch = []
+    started = time.perf_counter()
+    for line_no, record in rows:
+        try:
+            batch.append((line_no, *validate(record)))
+        except ValueError as e:
+            report.invalid.append((line_no, str(e)))
+            continue
+        if len(batch) >= batch_size:
+            _write_batch(batch, on_duplicate, seen, seen_skus, report)
+            batch = []
+    if batch:
+        _write_batch(batch, on_duplicate, seen, seen_skus, report)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def print_report(report, out=sys.stdout):
+    for label, problems in (('Duplicate', report.duplicates), ('Invalid', report.invalid)):
+        for line_no, detail in problems[:MAX_REPORTED]:
+            print(f"{label} row at line {line_no}: {detail}", file=out)
+        if len(problems) > MAX_REPORTED:
+            print(f"... and {len(problems) - MAX_REPORTED} more {label.lower()} rows", file=out)
+    print(f"Imported {report.inserted} new, {report.updated} updated, "
+          f"{len(report.duplicates)} duplicate, {len(report.invalid)} invalid "
+          f"in {report.elapsed:.2f}s ({report.rows_per_sec:,.0f} rows/sec)", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import products from CSV or JSONL.')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'jsonl'),
+                        help='defaults to jsonl for .jsonl/.ndjson files, csv otherwise')
+    parser.add_argument('--db', default=app.DB_NAME)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--on-duplicate', choices=('skip', 'update'), default='skip')
+    args = parser.parse_args(argv)
+
+    db.configure(args.db)
+    app.create_database()
+    report = import_products(read_rows(args.path, args.format),
+                             args.batch_size, args.on_duplicate)
+    print_report(report)
+    return 1 if report.invalid else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,415 @@
+"""Monthly partitions of the sales ledger.
+
+New sales always go to the ``sales`` table; rotate() moves whole months older
+than HOT_MONTHS into their own tables (``sales_2024_05`` ...) listed in
+sales_partitions.  Readers go through source(), which returns the ``sales``
+table or a UNION ALL of it and just the partitions that overlap the
+requested time range.  SQLite pushes ORDER BY / LIMIT and the range filter
+into each arm, so every partition is read through its own ts index.
+
+archive() moves partitions older than ARCHIVE_MONTHS out of the main file
+into ``<db>_archive.db``, which source() ATTACHes only when a range reaches
+back that far.  Archived months are stored clustered on (ts, id) with no
+other index, and are append-only, so the archive stays compact.  The daily
+rollups are never archived: reports over any period still read the main
+file alone.  The ``sales_ledger`` view covers the partitions in the main
+file, for ad-hoc SQL (a view cannot refer to an attached database).
+
+Neither runs on the startup path: main.maintain_database() calls both from a
+background thread in the app and the server, and ``python ledger.py`` runs
+them by hand.
+
+Timestamps are integer microseconds since the Unix epoch, UTC.
+"""
+import argparse
+import datetime
+import os
+import time
+
+import db
+
+HOT_MONTHS = 3
+ARCHIVE_MONTHS = 12
+ARCHIVE = 'archive'
+COLUMNS = 'id, product_id, quantity_sold, total_price, date, basket_id, ts'
+# Rows moved per transaction by rotate() and archive(); a chunk holds the
+# write lock for a few tens of milliseconds, well inside db's busy_timeout.
+CHUNK_ROWS = 5000
+CHUNK_PAUSE = 0.005
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def now_ts():
+    return time.time_ns() // 1000
+
+
+def ts_date(ts):
+    """The UTC calendar date of ts, as the ISO text stored in sales.date."""
+    return (EPOCH + datetime.timedelta(microseconds=ts)).date().isoformat()
+
+
+def date_ts(date):
+    """Microseconds at 00:00 UTC on an ISO date (or datetime.date)."""
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    return (date - EPOCH.date()).days * 86400 * 1000000
+
+
+def date_range_ts(start_date=None, end_date=None):
+    """[start, end) in microseconds for an inclusive range of ISO dates."""
+    start_ts = date_ts(start_date) if start_date else None
+    end_ts = date_ts(end_date) + 86400 * 1000000 if end_date else None
+    return start_ts, end_ts
+
+
+def month_bounds(year, month):
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return date_ts(start), date_ts(end)
+
+
+def partition_name(year, month):
+    return f'sales_{year:04d}_{month:02d}'
+
+
+def cutoff_ts(keep_months, now=None):
+    """Start of the oldest of the last keep_months calendar months."""
+    today = (EPOCH + datetime.timedelta(microseconds=now or now_ts())).date()
+    months = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return month_bounds(months // 12, months % 12 + 1)[0]
+
+
+def archive_path(conn):
+    """The archive file kept beside conn's main database file."""
+    main_file = conn.execute(
+        "SELECT file FROM pragma_database_list WHERE name = 'main'").fetchone()[0]
+    root, ext = os.path.splitext(main_file)
+    return f'{root}_archive{ext or ".db"}'
+
+
+def attach_archive(conn):
+    """ATTACH the archive to conn unless it already is.  Not inside a transaction."""
+    attached = conn.execute(
+        'SELECT 1 FROM pragma_database_list WHERE name = ?', (ARCHIVE,)).fetchone()
+    if attached is None:
+        conn.execute(f'ATTACH DATABASE ? AS {ARCHIVE}', (archive_path(conn),))
+
+
+def partitions(conn, start_ts=None, end_ts=None, archived=True):
+    """Partition tables overlapping [start_ts, end_ts), newest first.
+
+    Archived ones are schema-qualified and attached on demand; archived=False
+    leaves them out.
+    """
+    rows = conn.execute('''
+        SELECT db, name
+        FROM sales_partitions
+        WHERE end_ts > ? AND start_ts < ?
+        ORDER BY start_ts DESC
+    ''', (start_ts if start_ts is not None else -2 ** 63,
+          end_ts if end_ts is not None else 2 ** 63 - 1)).fetchall()
+    if not archived:
+        return [name for location, name in rows if location == 'main']
+    if any(location == ARCHIVE for location, _ in rows):
+        attach_archive(conn)
+    return [name if location == 'main' else f'{location}.{name}' for location, name in rows]
+
+
+def partitions_end(conn):
+    """End of the newest partition (None before the first rotation).
+
+    Sales at or after it can only be in the ``sales`` table.
+    """
+    return conn.execute('SELECT MAX(end_ts) FROM sales_partitions').fetchone()[0]
+
+
+def source(conn, start_ts=None, end_ts=None, archived=True):
+    """SQL for a FROM clause covering the ledger rows in [start_ts, end_ts).
+
+    Callers still filter on ts themselves; this only leaves out the
+    partitions that cannot match.
+    """
+    tables = ['sales'] + partitions(conn, start_ts, end_ts, archived)
+    if len(tables) == 1:
+        return 'sales'
+    return '(' + ' UNION ALL '.join(f'SELECT {COLUMNS} FROM {table}' for table in tables) + ')'
+
+
+def rebuild_view(conn):
+    conn.execute('DROP VIEW IF EXISTS sales_ledger')
+    conn.execute(f'CREATE VIEW sales_ledger AS SELECT {COLUMNS} FROM '
+                 f'{source(conn, archived=False)}')
+
+
+def _create_archive_table(conn, name):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ARCHIVE}.{name} (
+            ts INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            product_id INTEGER,
+            quantity_sold INTEGER,
+            total_price REAL,
+            date TEXT,
+            basket_id INTEGER,
+            PRIMARY KEY (ts, id)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _change_log_triggers(conn):
+    return conn.execute('''
+        SELECT name, sql
+        FROM sqlite_master
+        WHERE type = 'trigger' AND tbl_name = 'sales' AND sql LIKE '%change_log%'
+    ''').fetchall()
+
+
+def _write(conn, work, immediate=True):
+    """Run work(conn) in its own transaction and commit it.
+
+    After a write to the main file, waits at least as long as the lock was
+    held, so registers waiting on busy_timeout get their turn between chunks.
+    """
+    started = time.perf_counter()
+    conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+    try:
+        result = work(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if immediate:
+        time.sleep(max(CHUNK_PAUSE, time.perf_counter() - started))
+    return result
+
+
+def _chunk_end(conn, table, start_ts, end_ts, after=(-2 ** 63, 0)):
+    """(ts, id) of the last row of the next chunk of table, or None.
+
+    A chunk is the next CHUNK_ROWS rows in [start_ts, end_ts) after the
+    (ts, id) ``after``, in (ts, id) order, read through the ts index.
+    """
+    return conn.execute(f'''
+        SELECT ts, id FROM (
+            SELECT ts, id FROM {table}
+            WHERE ts >= ? AND ts < ? AND (ts, id) > (?, ?)
+            ORDER BY ts, id
+            LIMIT ?
+        )
+        ORDER BY ts DESC, id DESC
+        LIMIT 1
+    ''', (start_ts, end_ts, *after, CHUNK_ROWS)).fetchone()
+
+
+def _without_change_log(conn, statement, params):
+    """Run statement with the change_log triggers on sales dropped.
+
+    They are recreated before the transaction commits: the rows moved out of
+    sales are still in the ledger, not deleted.
+    """
+    triggers = _change_log_triggers(conn)
+    for name, _ in triggers:
+        conn.execute(f'DROP TRIGGER {name}')
+    conn.execute(statement, params)
+    for _, sql in triggers:
+        conn.execute(sql)
+
+
+def _create_partition(conn, name, month, start_ts, end_ts):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            product_id INTEGER,
+            quantity_sold INTEGER,
+            total_price REAL,
+            date TEXT,
+            basket_id INTEGER,
+            ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_{name}_ts
+            ON {name} (ts, id, product_id, quantity_sold, total_price, date)
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO sales_partitions (name, month, start_ts, end_ts)
+        VALUES (?, ?, ?, ?)
+    ''', (name, month, start_ts, end_ts))
+    rebuild_view(conn)
+
+
+def _move_chunk(conn, name, start_ts, end_ts):
+    """Move the next chunk of the month out of sales into its partition."""
+    end = _chunk_end(conn, 'sales', start_ts, end_ts)
+    if end is None:
+        return False
+    conn.execute(f'''
+        INSERT OR IGNORE INTO {name} ({COLUMNS})
+        SELECT {COLUMNS} FROM sales WHERE ts >= ? AND (ts, id) <= (?, ?)
+    ''', (start_ts, *end))
+    _without_change_log(conn, 'DELETE FROM sales WHERE ts >= ? AND (ts, id) <= (?, ?)',
+                        (start_ts, *end))
+    return True
+
+
+def _archive_chunk(conn, name, start_ts, end_ts):
+    """Copy the next chunk of the month from sales into the archive.
+
+    Only the archive is written, so this takes no lock on the main file.
+    """
+    end = _chunk_end(conn, 'sales', start_ts, end_ts)
+    if end is not None:
+        conn.execute(f'''
+            INSERT OR IGNORE INTO {ARCHIVE}.{name} ({COLUMNS})
+            SELECT {COLUMNS} FROM sales WHERE ts >= ? AND (ts, id) <= (?, ?)
+        ''', (start_ts, *end))
+    return end
+
+
+def _move_month(conn, oldest):
+    """Move the month holding ts ``oldest`` out of sales; returns its table.
+
+    Rows go in (ts, id) order, CHUNK_ROWS per transaction.  The partition is
+    created and registered first, and rows are in sales or in the partition
+    at every commit, so an interrupted move is finished by the next run.
+    """
+    day = EPOCH + datetime.timedelta(microseconds=oldest)
+    start_ts, end_ts = month_bounds(day.year, day.month)
+    name = partition_name(day.year, day.month)
+    location = conn.execute('SELECT db FROM sales_partitions WHERE name = ?',
+                            (name,)).fetchone()
+    if location is not None and location[0] == ARCHIVE:
+        # Late sales for an already archived month are added to the archive.
+        # The two files do not commit atomically together, so each chunk is
+        # committed in the archive before it is deleted from sales; only rows
+        # already in the archive are deleted.
+        while (end := _write(conn, lambda c: _archive_chunk(c, name, start_ts, end_ts),
+                             immediate=False)) is not None:
+            _write(conn, lambda c: _without_change_log(c, f'''
+                DELETE FROM sales
+                WHERE ts >= ? AND (ts, id) <= (?, ?)
+                  AND EXISTS (SELECT 1 FROM {ARCHIVE}.{name} AS a
+                              WHERE a.ts = sales.ts AND a.id = sales.id)
+            ''', (start_ts, *end)))
+        return f'{ARCHIVE}.{name}'
+    _write(conn, lambda c: _create_partition(c, name, day.strftime('%Y-%m'), start_ts, end_ts))
+    while _write(conn, lambda c: _move_chunk(c, name, start_ts, end_ts)):
+        pass
+    return name
+
+
+def rotate(keep_months=HOT_MONTHS, now=None):
+    """Move sales older than the last keep_months months into monthly tables.
+
+    Returns the partitions written to.  Rows are moved CHUNK_ROWS at a time,
+    each chunk in its own short transaction, so a register never waits for
+    more than one chunk.
+    """
+    cutoff = cutoff_ts(keep_months, now)
+    moved = []
+    with db.connection() as conn:
+        if conn.execute('SELECT 1 FROM sales_partitions WHERE db = ?', (ARCHIVE,)).fetchone():
+            attach_archive(conn)
+        while True:
+            oldest = conn.execute('SELECT MIN(ts) FROM sales').fetchone()[0]
+            if oldest is None or oldest >= cutoff:
+                return moved
+            moved.append(_move_month(conn, oldest))
+
+
+def _copy_to_archive(conn, name):
+    """Copy main.name into the archive, CHUNK_ROWS rows per transaction.
+
+    Resumes after the newest row already copied.
+    """
+    _create_archive_table(conn, name)
+    after = conn.execute(f'''
+        SELECT ts, id FROM {ARCHIVE}.{name} ORDER BY ts DESC, id DESC LIMIT 1
+    ''').fetchone() or (-2 ** 63, 0)
+
+    def copy_chunk(conn):
+        end = _chunk_end(conn, f'main.{name}', -2 ** 63, 2 ** 63 - 1, after)
+        if end is not None:
+            conn.execute(f'''
+                INSERT OR IGNORE INTO {ARCHIVE}.{name} ({COLUMNS})
+                SELECT {COLUMNS} FROM main.{name}
+                WHERE (ts, id) > (?, ?) AND (ts, id) <= (?, ?)
+                ORDER BY ts, id
+            ''', (*after, *end))
+        return end
+
+    while (end := _write(conn, copy_chunk, immediate=False)) is not None:
+        after = end
+
+
+def _drop_main_table(conn, name):
+    """Empty main.name CHUNK_ROWS rows at a time, then drop it."""
+    def delete_chunk(conn):
+        return conn.execute(f'''
+            DELETE FROM main.{name}
+            WHERE id IN (SELECT id FROM main.{name} LIMIT ?)
+        ''', (CHUNK_ROWS,)).rowcount
+
+    while _write(conn, delete_chunk):
+        pass
+    _write(conn, lambda c: c.execute(f'DROP TABLE main.{name}'))
+
+
+def archive(keep_months=ARCHIVE_MONTHS, now=None):
+    """Move the partitions older than the last keep_months months to the archive.
+
+    Returns the partitions moved.  A month is copied and committed in the
+    archive chunk by chunk, then switched over to it in sales_partitions,
+    and only then deleted from the main file, again in chunks.  An
+    interrupted run leaves the month readable from one file or the other,
+    and the next run picks up where it stopped.
+    """
+    with db.connection() as conn:
+        names = [row[0] for row in conn.execute('''
+            SELECT name
+            FROM sales_partitions
+            WHERE db = 'main' AND end_ts <= ?
+            ORDER BY start_ts
+        ''', (cutoff_ts(keep_months, now),))]
+        # Archived months whose main copy was not fully dropped last time.
+        leftover = [row[0] for row in conn.execute('''
+            SELECT p.name
+            FROM sales_partitions AS p
+            JOIN sqlite_master AS m ON m.type = 'table' AND m.name = p.name
+            WHERE p.db = ?
+        ''', (ARCHIVE,))]
+        if not names and not leftover:
+            return names
+        attach_archive(conn)
+        conn.execute(f'PRAGMA {ARCHIVE}.journal_mode = WAL').fetchall()
+        for name in names:
+            _copy_to_archive(conn, name)
+
+            def switch(conn):
+                conn.execute('UPDATE sales_partitions SET db = ? WHERE name = ?', (ARCHIVE, name))
+                rebuild_view(conn)
+
+            _write(conn, switch)
+        for name in leftover + names:
+            _drop_main_table(conn, name)
+    return names
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Partition and archive the sales ledger of a retail database.')
+    parser.add_argument('--db', default=db.DEFAULT_DB_NAME)
+    parser.add_argument('--hot-months', type=int, default=HOT_MONTHS)
+    parser.add_argument('--archive-months', type=int, default=ARCHIVE_MONTHS)
+    parser.add_argument('--vacuum', action='store_true',
+                        help='return the space freed in the main file to the filesystem')
+    args = parser.parse_args()
+    db.configure(args.db, size=1)
+    for name in rotate(args.hot_months):
+        print(f"Partitioned {name}")
+    for name in archive(args.archive_months):
+        print(f"Archived {name}")
+    if args.vacuum:
+        with db.connection() as conn:
+            conn.execute('VACUUM')
+    db.close_pool()
@@ -1,15 +1,49 @@
+import datetime
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import os
-import urllib.request
+from tkinter import ttk, messagebox, filedialog
+
+import backup
+import db
+import icons
+import ledger
+import migrations
+import profiling
+import queries
+from catalog import catalog
+from widgets import VirtualTreeview
+from worker import DBWorker, PeriodicTask
+
+# Start of the clock for the startup timings.
+STARTED = time.perf_counter()
 
 DB_NAME = 'retail_management.db'
+PAGE_SIZE = 500
+# Views fall back to a full reload past this many pending changes.
+MAX_INCREMENTAL_CHANGES = 1000
+CHANGE_LOG_RETENTION = 100000
+# Seconds between background maintain_database() runs.
+MAINTENANCE_INTERVAL = 600
+TOP_PRODUCTS = 10
+# Days before today the analytics tab opens on; an all-time summary reads
+# rollup rows for every day of the store's history.
+REPORT_DEFAULT_DAYS = 29
+SEARCH_LIMIT = 20
+INVENTORY_SEARCH_LIMIT = 500
+SEARCH_DEBOUNCE_MS = 200
+BACKUP_POLL_MS = 100
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+db.configure(DB_NAME)
 
 # Database Functions
+@profiling.profiled
 def create_database():
-    with sqlite3.connect(DB_NAME) as conn:
+    with db.connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS products (
@@ -30,89 +64,453 @@ def create_database():
             )
         ''')
         conn.commit()
+        migrations.upgrade(conn)
+        prune_change_log()
 
-def add_product(name, price, quantity):
+@profiling.profiled
+def add_product(name, price, quantity, sku=None):
+    sku = (sku or '').strip() or None
     try:
-        with sqlite3.connect(DB_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO products (name, price, quantity)
-                VALUES (?, ?, ?)
-            ''', (name, price, quantity))
+        with db.connection() as conn:
+            cursor = queries.execute(conn, 'product.insert', (name, price, quantity, sku))
             conn.commit()
+            catalog.put((cursor.lastrowid, name, float(price), quantity), sku=sku)
         return True, "Product added successfully."
-    except sqlite3.IntegrityError:
+    except sqlite3.IntegrityError as e:
+        if 'products.sku' in str(e):
+            return False, "SKU / barcode already exists!"
         return False, "Product name already exists!"
     except Exception as e:
         return False, str(e)
 
+@profiling.profiled
 def delete_product(product_id):
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM products WHERE id = ?', (product_id,))
+    with db.connection() as conn:
+        queries.execute(conn, 'product.delete', (product_id,))
         conn.commit()
+        catalog.remove(product_id)
 
-def get_all_products():
-    with sqlite3.connect(DB_NAME) as conn:
+# offset is only for jumping to an arbitrary position; when the previous
+# page is known, pass its last id as after_id instead.
+@profiling.profiled
+def get_products_page(after_id=None, limit=PAGE_SIZE, offset=0):
+    with db.connection() as conn:
+        return queries.fetchall(conn, 'product.page', (after_id or 0, limit, offset))
+
+# Type-ahead product search: FTS5 prefix match on each word of the query
+# when products_fts exists, else a case-insensitive prefix of the whole name.
+# A numeric query also matches that product id.
+@profiling.profiled
+def search_products(text, limit=SEARCH_LIMIT):
+    text = text.strip()
+    if not text:
+        return get_products_page(limit=limit)
+    with db.connection() as conn:
+        has_fts = queries.fetchone(conn, 'product.has_search_index')
+        tokens = re.findall(r'\w+', text)
+        if has_fts and tokens:
+            rows = queries.fetchall(conn, 'product.search',
+                                    (' '.join(f'"{token}"*' for token in tokens), limit))
+        else:
+            rows = queries.fetchall(conn, 'product.search_prefix',
+                                    (text, text + '\uffff', limit))
+    if text.isdigit():
+        product = get_product(int(text))
+        if product and product not in rows:
+            rows = [product] + rows[:limit - 1]
+    return rows
+
+def count_products():
+    return catalog.count()
+
+def iter_products(chunk_size=PAGE_SIZE):
+    with db.checkout() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT id, name, price, quantity FROM products')
-        return cursor.fetchall()
+        try:
+            cursor.execute('SELECT id, name, price, quantity FROM products ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+@profiling.profiled
+def get_all_products():
+    return catalog.all()
+
+@profiling.profiled
+def get_product(product_id):
+    return catalog.get(product_id)
+
+def get_product_by_name(name):
+    return catalog.by_name(name)
 
+# Served from the catalog's in-memory SKU index, after the same freshness
+# check as every catalog read, so the GUI calls it on the DB worker.
+def lookup_product_by_code(code):
+    code = code.strip()
+    if not code:
+        return None
+    return catalog.by_sku(code)
+
+@profiling.profiled
 def update_product_quantity(product_id, new_quantity):
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE products 
-            SET quantity = ? 
-            WHERE id = ?
-        ''', (new_quantity, product_id))
+    with db.connection() as conn:
+        queries.execute(conn, 'product.set_quantity', (new_quantity, product_id))
         conn.commit()
+        catalog.set_quantity(product_id, new_quantity)
+
+# Records one checkout: a baskets row plus its (product_id, quantity_sold,
+# total_price) sales lines, all dated from the basket.  Runs inside the
+# caller's transaction.
+def _insert_basket(cursor, sales):
+    ts = ledger.now_ts()
+    date = ledger.ts_date(ts)
+    queries.execute(cursor, 'basket.insert', (date, len(sales), sum(sale[2] for sale in sales)))
+    basket_id = cursor.lastrowid
+    queries.executemany(cursor, 'sale.insert',
+                        [(*sale, date, basket_id, ts) for sale in sales])
+    return basket_id
+
+# The stock check is part of the UPDATE itself, so two registers selling the
+# last unit cannot both succeed.  Returns (price, remaining quantity), or
+# None when nothing was taken.
+def _take_stock(cursor, product_id, quantity_sold):
+    if HAS_RETURNING:
+        return queries.fetchone(cursor, 'stock.take', (quantity_sold, product_id, quantity_sold))
+    queries.execute(cursor, 'stock.take_no_returning', (quantity_sold, product_id, quantity_sold))
+    if not cursor.rowcount:
+        return None
+    return queries.fetchone(cursor, 'product.price_quantity', (product_id,))
 
+def _stock_failure(cursor, product_id):
+    exists = queries.fetchone(cursor, 'product.exists', (product_id,))
+    return 'Insufficient stock.' if exists else 'Product not found.'
+
+@profiling.profiled
 def process_sale(product_id, quantity_sold):
+    if quantity_sold <= 0:
+        return False, 'Invalid quantity.'
     try:
-        with sqlite3.connect(DB_NAME) as conn:
+        with db.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT price, quantity 
-                FROM products 
-                WHERE id = ?
-            ''', (product_id,))
-            product = cursor.fetchone()
-            
-            if not product:
-                return False, 'Product not found.'
-                
-            price, current_quantity = product
-            if current_quantity < quantity_sold:
-                return False, 'Insufficient stock.'
-                
-            total_price = price * quantity_sold
-            cursor.execute('''
-                UPDATE products 
-                SET quantity = quantity - ? 
-                WHERE id = ?
-            ''', (quantity_sold, product_id))
-            
-            cursor.execute('''
-                INSERT INTO sales (product_id, quantity_sold, total_price, date)
-                VALUES (?, ?, ?, DATE("now"))
-            ''', (product_id, quantity_sold, total_price))
+            cursor.execute('BEGIN IMMEDIATE')
+            row = _take_stock(cursor, product_id, quantity_sold)
+            if row is None:
+                reason = _stock_failure(cursor, product_id)
+                conn.rollback()
+                return False, reason
+
+            total_price = row[0] * quantity_sold
+            _insert_basket(cursor, [(product_id, quantity_sold, total_price)])
             conn.commit()
+            catalog.set_quantity(product_id, row[1])
             
         return True, f'Sale processed! Total: ${total_price:.2f}'
     except Exception as e:
         return False, str(e)
 
+# Commits many independent single-line sales in one transaction (group
+# commit); each is its own basket and gets its own (success, message), as
+# process_sale() would return.  A failed line takes no stock, so it needs
+# no savepoint.
+@profiling.profiled
+def process_sale_group(sales):
+    results = []
+    sold = {}
+    try:
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            for product_id, quantity_sold in sales:
+                if quantity_sold <= 0:
+                    results.append((False, 'Invalid quantity.'))
+                    continue
+                row = _take_stock(cursor, product_id, quantity_sold)
+                if row is None:
+                    results.append((False, _stock_failure(cursor, product_id)))
+                    continue
+                total_price = row[0] * quantity_sold
+                _insert_basket(cursor, [(product_id, quantity_sold, total_price)])
+                sold[product_id] = row[1]
+                results.append((True, f'Sale processed! Total: ${total_price:.2f}'))
+            conn.commit()
+    except Exception as e:
+        return [(False, str(e))] * len(sales)
+    for product_id, quantity in sold.items():
+        catalog.set_quantity(product_id, quantity)
+    return results
+
+# Sells every (product_id, quantity) line of a cart in one transaction.
+# Returns (success, message, failures); failures lists (line index, reason)
+# and when it is non-empty nothing was sold.
+@profiling.profiled
+def process_sale_batch(lines):
+    if not lines:
+        return False, 'Cart is empty.', []
+    try:
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            # Take the write lock before reading stock so the check holds
+            # until commit.
+            cursor.execute('BEGIN IMMEDIATE')
+            product_ids = sorted({product_id for product_id, _ in lines})
+            placeholders = ', '.join('?' * len(product_ids))
+            cursor.execute(f'''
+                SELECT id, price, quantity
+                FROM products
+                WHERE id IN ({placeholders})
+            ''', product_ids)
+            stock = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+            requested = {}
+            for product_id, quantity_sold in lines:
+                requested[product_id] = requested.get(product_id, 0) + quantity_sold
+
+            failures = []
+            for index, (product_id, quantity_sold) in enumerate(lines):
+                if quantity_sold <= 0:
+                    failures.append((index, 'Invalid quantity.'))
+                elif product_id not in stock:
+                    failures.append((index, 'Product not found.'))
+                elif stock[product_id][1] < requested[product_id]:
+                    failures.append((index, 'Insufficient stock.'))
+            if failures:
+                conn.rollback()
+                return False, f'{len(failures)} line(s) could not be sold.', failures
+
+            queries.executemany(cursor, 'stock.decrement',
+                                [(quantity, product_id) for product_id, quantity in requested.items()])
+            sales = [(product_id, quantity_sold, stock[product_id][0] * quantity_sold)
+                     for product_id, quantity_sold in lines]
+            _insert_basket(cursor, sales)
+            conn.commit()
+            for product_id, quantity in requested.items():
+                catalog.set_quantity(product_id, stock[product_id][1] - quantity)
+
+        total_price = sum(sale[2] for sale in sales)
+        return True, f'Sale processed! {len(lines)} line(s), Total: ${total_price:.2f}', []
+    except Exception as e:
+        return False, str(e), []
+
+# Sales rows are (id, product name, quantity, total, sold at, ts), newest
+# first; (ts, id) is the keyset cursor, so pass the ts and id of the last row
+# seen to fetch the next page.  start_date / end_date (inclusive ISO dates)
+# limit the rows, and the ledger partitions read, to that range.
+SALE_COLUMNS = '''
+    s.id, p.name, s.quantity_sold, s.total_price,
+    datetime(s.ts / 1000000, 'unixepoch'), s.ts
+'''
+
+def _ts_filter(start_date, end_date):
+    start_ts, end_ts = ledger.date_range_ts(start_date, end_date)
+    where = []
+    params = []
+    if start_ts is not None:
+        where.append('s.ts >= ?')
+        params.append(start_ts)
+    if end_ts is not None:
+        where.append('s.ts < ?')
+        params.append(end_ts)
+    return start_ts, end_ts, where, params
+
+@profiling.profiled
+def get_sales_page(after_ts=None, after_id=None, limit=PAGE_SIZE, offset=0,
+                   start_date=None, end_date=None):
+    start_ts, end_ts, where, params = _ts_filter(start_date, end_date)
+    if after_ts is not None:
+        where.append('(s.ts, s.id) < (?, ?)')
+        params.extend((after_ts, after_id if after_id is not None else -1))
+    where = f"WHERE {' AND '.join(where)}" if where else ''
+    query = f'''
+        SELECT {SALE_COLUMNS}
+        FROM {{}} s
+        JOIN products p ON s.product_id = p.id
+        {where}
+        ORDER BY s.ts DESC, s.id DESC
+        LIMIT ? OFFSET ?
+    '''
+    params = (*params, limit, offset)
+    with db.connection() as conn:
+        # Recent pages come from the hot table alone: once it fills the page
+        # with rows newer than every partition, nothing older can rank higher.
+        rows = conn.execute(query.format('sales'), params).fetchall()
+        partitions_end = ledger.partitions_end(conn)
+        if partitions_end is None or (len(rows) == limit and rows[-1][5] >= partitions_end):
+            return rows
+        return conn.execute(query.format(ledger.source(conn, start_ts, end_ts)),
+                            params).fetchall()
+
+# Counted per partition: a COUNT over the UNION ALL would materialize it.
+@profiling.profiled
+def count_sales(start_date=None, end_date=None):
+    start_ts, end_ts, where, params = _ts_filter(start_date, end_date)
+    where = f"WHERE {' AND '.join(where)}" if where else ''
+    with db.connection() as conn:
+        total = 0
+        for table in ['sales'] + ledger.partitions(conn, start_ts, end_ts):
+            total += conn.execute(f'''
+                SELECT COUNT(*)
+                FROM {table} s
+                JOIN products p ON s.product_id = p.id
+                {where}
+            ''', params).fetchone()[0]
+        return total
+
+def iter_sales(chunk_size=PAGE_SIZE):
+    with db.checkout() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'''
+                SELECT {SALE_COLUMNS}
+                FROM {ledger.source(conn)} s
+                JOIN products p ON s.product_id = p.id
+                ORDER BY s.ts DESC, s.id DESC
+            ''')
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+@profiling.profiled
 def get_all_sales():
-    with sqlite3.connect(DB_NAME) as conn:
+    return list(iter_sales())
+
+# Sales reports, read from sales_daily_rollup rather than scanning sales.
+# Dates are 'YYYY-MM-DD' strings and both bounds are inclusive.
+ROLLUP_PERIODS = {
+    'day': 'report.revenue_by_day',
+    'week': 'report.revenue_by_week',
+    'month': 'report.revenue_by_month',
+}
+
+@profiling.profiled
+def get_revenue_by_period(period='day', start_date=None, end_date=None):
+    statement = ROLLUP_PERIODS[period]
+    with db.connection() as conn:
+        return queries.fetchall(conn, statement, (start_date or None, end_date or None))
+
+def get_revenue_by_day(start_date=None, end_date=None):
+    return get_revenue_by_period('day', start_date, end_date)
+
+def get_revenue_by_week(start_date=None, end_date=None):
+    return get_revenue_by_period('week', start_date, end_date)
+
+def get_revenue_by_month(start_date=None, end_date=None):
+    return get_revenue_by_period('month', start_date, end_date)
+
+@profiling.profiled
+def get_revenue_by_product(start_date=None, end_date=None, limit=None):
+    with db.connection() as conn:
+        return queries.fetchall(conn, 'report.revenue_by_product',
+                                (start_date or None, end_date or None,
+                                 -1 if limit is None else limit))
+
+# Dashboard KPIs for a date range, computed from the rollup tables so only
+# summary rows leave SQLite.
+@profiling.profiled
+def get_sales_summary(start_date=None, end_date=None, top_n=TOP_PRODUCTS):
+    bounds = (start_date or None, end_date or None)
+    with db.connection() as conn:
+        units, revenue = queries.fetchone(conn, 'report.totals', bounds)
+        baskets = queries.fetchone(conn, 'report.baskets', bounds)[0]
+        return {
+            'revenue': revenue,
+            'units': units,
+            'baskets': baskets,
+            'average_basket': revenue / baskets if baskets else 0.0,
+            'top_products': get_revenue_by_product(start_date, end_date, top_n),
+            'daily': get_revenue_by_day(start_date, end_date),
+        }
+
+def _select_by_ids(query, ids):
+    ids = list(ids)
+    rows = []
+    with db.connection() as conn:
+        for i in range(0, len(ids), PAGE_SIZE):
+            chunk = ids[i:i + PAGE_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            rows.extend(conn.execute(query.format(placeholders), chunk).fetchall())
+    return rows
+
+def get_products_by_ids(ids):
+    return catalog.get_many(ids)
+
+# Changed rows are recent; the archive is never read for them.
+@profiling.profiled
+def get_sales_by_ids(ids):
+    with db.connection() as conn:
+        source = ledger.source(conn, archived=False)
+    return _select_by_ids(f'''
+        SELECT {SALE_COLUMNS}
+        FROM {source} s
+        JOIN products p ON s.product_id = p.id
+        WHERE s.id IN ({{}})
+    ''', ids)
+
+# Change tracking
+def latest_change_seq():
+    with db.connection() as conn:
+        return queries.fetchone(conn, 'change_log.latest')[0]
+
+# Changes to the given tables after since_seq, oldest first, or None when
+# the caller has to reload instead (log pruned past since_seq, or more than
+# limit changes pending).
+@profiling.profiled
+def get_changes(since_seq, table_names, limit=MAX_INCREMENTAL_CHANGES):
+    with db.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT s.id, p.name, s.quantity_sold, s.total_price, s.date
-            FROM sales s
-            JOIN products p ON s.product_id = p.id
-            ORDER BY s.date DESC
-        ''')
-        return cursor.fetchall()
+        oldest = queries.fetchone(cursor, 'change_log.oldest')[0]
+        if oldest is not None and oldest > since_seq + 1:
+            return None
+        placeholders = ', '.join('?' * len(table_names))
+        cursor.execute(f'''
+            SELECT seq, table_name, row_id, op
+            FROM change_log
+            WHERE seq > ? AND table_name IN ({placeholders})
+            ORDER BY seq
+            LIMIT ?
+        ''', (since_seq, *table_names, limit + 1))
+        changes = cursor.fetchall()
+    if len(changes) > limit:
+        return None
+    return changes
+
+def summarize_changes(changes, table_name):
+    # Collapse a table's changes to their net effect per row:
+    # (inserted ids, updated ids, deleted ids).
+    net = {}
+    for _, table, row_id, op in changes:
+        if table != table_name:
+            continue
+        previous = net.get(row_id)
+        if op == 'delete':
+            net[row_id] = None if previous == 'insert' else 'delete'
+        elif previous != 'insert':
+            net[row_id] = op
+    by_op = {'insert': [], 'update': [], 'delete': []}
+    for row_id, op in net.items():
+        if op:
+            by_op[op].append(row_id)
+    return by_op['insert'], by_op['update'], by_op['delete']
+
+@profiling.profiled
+def prune_change_log(keep=CHANGE_LOG_RETENTION):
+    with db.connection() as conn:
+        queries.execute(conn, 'change_log.prune', (keep,))
+        conn.commit()
+
+# Housekeeping that moves data around, so its cost grows with the store:
+# run from a background thread, never on the startup path.
+def maintain_database():
+    ledger.rotate()
+    ledger.archive()
+    prune_change_log()
 
 # GUI Application
 class RetailManagementApp:
@@ -122,14 +520,35 @@ class RetailManagementApp:
         self.root.geometry("1280x800")
         self.root.configure(bg='#f5f6fa')
         self.style = ttk.Style()
-        
-        # Initialize icons first
-        self.icons = {}
-        self.download_icons()
-        
+        # Startup and tab build times in milliseconds, keyed by phase.
+        self.timings = {}
+
+        create_database()
+        # Last change_log sequence each view has applied, keyed by view.
+        self.change_seq = {}
+        self.sale_matches = {}
+        self.inventory_matches = None
+        # Date range picked on the analytics tab, and the one the sales list
+        # was last loaded with.
+        self.report_range = (None, None)
+        self.report_list_range = (None, None)
+        self.pending_after = {}
+        self.cart = []
+        self.db_worker = DBWorker(root, on_error=self.show_db_error, on_busy=self.set_busy)
+        # Rotated snapshots in the background, when RETAIL_BACKUP_DIR is set.
+        self.snapshots = None
+        if os.environ.get('RETAIL_BACKUP_DIR'):
+            self.snapshots = backup.SnapshotScheduler(
+                os.environ['RETAIL_BACKUP_DIR'],
+                float(os.environ.get('RETAIL_BACKUP_INTERVAL', backup.DEFAULT_INTERVAL)),
+                int(os.environ.get('RETAIL_BACKUP_KEEP', backup.DEFAULT_KEEP)))
+            self.snapshots.start()
+        # Ledger rotation and change_log pruning, started after first paint.
+        self.maintenance = PeriodicTask(maintain_database, MAINTENANCE_INTERVAL, delay=0)
         self.configure_styles()
         self.create_widgets()
-        create_database()
+        self.timings['init'] = (time.perf_counter() - STARTED) * 1000
+        self.root.after_idle(self.on_first_paint)
 
     def configure_styles(self):
         self.style.theme_use('clam')
@@ -143,26 +562,6 @@ class RetailManagementApp:
         self.style.configure('Treeview', font=('Arial', 10), rowheight=25)
         self.style.configure('Treeview.Heading', font=('Arial', 10, 'bold'))
 
-    def download_icons(self):
-        icon_data = {
-            'add': 'https://raw.githubusercontent.com/FortAwesome/Font-Awesome/4.7.0/icons/plus-circle.png',
-            'delete': 'https://raw.githubusercontent.com/FortAwesome/Font-Awesome/4.7.0/icons/times-circle.png',
-            'sale': 'https://raw.githubusercontent.com/FortAwesome/Font-Awesome/4.7.0/icons/shopping-cart.png',
-            'report': 'https://raw.githubusercontent.com/FortAwesome/Font-Awesome/4.7.0/icons/bar-chart.png'
-        }
-        
-        os.makedirs('icons', exist_ok=True)
-        for name, url in icon_data.items():
-            path = f'icons/{name}.png'
-            try:
-                if not os.path.exists(path):
-                    urllib.request.urlretrieve(url, path)
-                img = Image.open(path).resize((24, 24))
-                self.icons[name] = ImageTk.PhotoImage(img)
-            except Exception as e:
-                print(f"Error loading {name} icon: {e}")
-                self.icons[name] = None
-
     def create_widgets(self):
         # Header
         header_frame = ttk.Frame(self.root, padding=20)
@@ -170,23 +569,105 @@ class RetailManagementApp:
         ttk.Label(header_frame, text="Narayana Stores", 
                  font=('Arial', 24, 'bold'), foreground='#2c3e50').pack()
 
+        # Status bar, shown while database requests are pending
+        status_frame = ttk.Frame(self.root, padding=(20, 0, 20, 10))
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_label = ttk.Label(status_frame, text="")
+        self.status_label.pack(side=tk.LEFT)
+        self.status_progress = ttk.Progressbar(status_frame, mode='indeterminate', length=120)
+        self.backup_button = ttk.Button(status_frame, text="Back Up...",
+                                        command=self.backup_database)
+        self.backup_button.pack(side=tk.RIGHT)
+
         # Notebook
         self.tabs = ttk.Notebook(self.root)
         self.tab_products = ttk.Frame(self.tabs)
         self.tab_inventory = ttk.Frame(self.tabs)
         self.tab_sales = ttk.Frame(self.tabs)
         self.tab_reports = ttk.Frame(self.tabs)
+        self.tab_diagnostics = ttk.Frame(self.tabs)
         
         self.tabs.add(self.tab_products, text=' Product Management ')
         self.tabs.add(self.tab_inventory, text=' Inventory ')
         self.tabs.add(self.tab_sales, text=' Point of Sale ')
         self.tabs.add(self.tab_reports, text=' Sales Analytics ')
+        # Hidden until toggled with Ctrl+Shift+D
+        self.tabs.add(self.tab_diagnostics, text=' Diagnostics ', state='hidden')
         self.tabs.pack(expand=1, fill='both', padx=20, pady=10)
+        self.root.bind('<Control-Shift-D>', self.toggle_diagnostics)
+
+        # Tab bodies, and the data loads they start, are built the first time
+        # the tab is shown, so startup does not depend on the data size.
+        self.tab_builders = {
+            str(self.tab_products): self.create_product_tab,
+            str(self.tab_inventory): self.create_inventory_tab,
+            str(self.tab_sales): self.create_sales_tab,
+            str(self.tab_reports): self.create_reports_tab,
+            str(self.tab_diagnostics): self.create_diagnostics_tab,
+        }
+        self.built_tabs = set()
+        self.tabs.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.build_tab(self.tabs.select())
 
-        self.create_product_tab()
-        self.create_inventory_tab()
-        self.create_sales_tab()
-        self.create_reports_tab()
+    def backup_database(self):
+        path = filedialog.asksaveasfilename(title="Back Up Database", defaultextension='.db',
+                                            filetypes=[("SQLite database", "*.db")])
+        if not path:
+            return
+        # Online backup on its own thread, so the DB worker, and the sales
+        # and refreshes queued on it, carry on while it runs.  The thread
+        # never touches Tk: it leaves its result in a queue polled from here.
+        self.backup_button.state(['disabled'])
+        results = queue.Queue(maxsize=1)
+        def run():
+            try:
+                results.put((backup.backup(path), None))
+            except Exception as e:
+                results.put((None, e))
+        threading.Thread(target=run, name='db-backup', daemon=True).start()
+        self.root.after(BACKUP_POLL_MS, self.poll_backup, results)
+
+    def poll_backup(self, results):
+        try:
+            report, error = results.get_nowait()
+        except queue.Empty:
+            self.root.after(BACKUP_POLL_MS, self.poll_backup, results)
+            return
+        self.on_backup_done(report, error)
+
+    def on_backup_done(self, report, error):
+        self.backup_button.state(['!disabled'])
+        if error is not None:
+            self.show_db_error(error)
+        else:
+            messagebox.showinfo("Backup", backup.format_report(report))
+
+    def on_tab_changed(self, event):
+        self.build_tab(self.tabs.select())
+
+    def build_tab(self, tab):
+        tab = str(tab)
+        builder = self.tab_builders.pop(tab, None)
+        if builder is None:
+            return
+        # Marked built first: builders end by refreshing their own view.
+        self.built_tabs.add(tab)
+        started = time.perf_counter()
+        builder()
+        name = self.tabs.tab(tab, 'text').strip()
+        self.timings[f'build {name}'] = (time.perf_counter() - started) * 1000
+
+    def is_built(self, tab):
+        return str(tab) in self.built_tabs
+
+    def on_first_paint(self):
+        # Flush the pending redraws so the time covers the painted window.
+        self.root.update_idletasks()
+        self.timings['first paint'] = (time.perf_counter() - STARTED) * 1000
+        self.maintenance.start()
+        if os.environ.get('RETAIL_STARTUP_TIMINGS'):
+            for phase, ms in self.timings.items():
+                print(f"{phase}: {ms:.1f} ms")
 
     def create_product_tab(self):
         frame = ttk.Frame(self.tab_products, padding=20)
@@ -207,35 +688,47 @@ class RetailManagementApp:
         self.product_quantity = ttk.Entry(form_frame, width=30)
         self.product_quantity.grid(row=2, column=1, padx=10, pady=10)
 
+        ttk.Label(form_frame, text="SKU / Barcode:").grid(row=3, column=0, padx=10, pady=10, sticky=tk.W)
+        self.product_sku = ttk.Entry(form_frame, width=30)
+        self.product_sku.grid(row=3, column=1, padx=10, pady=10)
+
         btn_frame = ttk.Frame(frame)
         btn_frame.pack(pady=20)
-        ttk.Button(btn_frame, text="Add Product", image=self.icons['add'],
-                  compound=tk.LEFT, command=self.add_product).pack(side=tk.LEFT, padx=10)
+        self.add_button = ttk.Button(btn_frame, text="Add Product", image=icons.get('add'),
+                                     compound=tk.LEFT, command=self.add_product)
+        self.add_button.pack(side=tk.LEFT, padx=10)
 
     def create_inventory_tab(self):
         frame = ttk.Frame(self.tab_inventory)
         frame.pack(expand=1, fill=tk.BOTH, padx=20, pady=20)
 
+        # Filter
+        search_frame = ttk.Frame(frame)
+        search_frame.grid(row=0, column=0, sticky=tk.W, pady=(0, 10))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.inventory_search = ttk.Entry(search_frame, width=40)
+        self.inventory_search.pack(side=tk.LEFT, padx=5)
+        self.inventory_search.bind('<KeyRelease>', lambda e: self.debounce(
+            'inventory_search', SEARCH_DEBOUNCE_MS, self.refresh_inventory))
+
         # Treeview
         columns = ('ID', 'Name', 'Price', 'Stock')
-        self.inventory_tree = ttk.Treeview(frame, columns=columns, show='headings')
+        self.inventory_tree = VirtualTreeview(frame, columns, count_products,
+                                              self.fetch_inventory_rows,
+                                              submit=self.db_worker.submit)
         for col in columns:
             self.inventory_tree.heading(col, text=col)
             self.inventory_tree.column(col, width=150, anchor=tk.CENTER)
         
-        vsb = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.inventory_tree.yview)
-        self.inventory_tree.configure(yscroll=vsb.set)
-        
-        self.inventory_tree.grid(row=0, column=0, sticky=tk.NSEW)
-        vsb.grid(row=0, column=1, sticky=tk.NS)
+        self.inventory_tree.grid(row=1, column=0, sticky=tk.NSEW)
         
         # Controls
         btn_frame = ttk.Frame(frame)
-        btn_frame.grid(row=1, column=0, pady=10)
-        ttk.Button(btn_frame, text="Delete Selected", image=self.icons['delete'],
+        btn_frame.grid(row=2, column=0, pady=10)
+        ttk.Button(btn_frame, text="Delete Selected", image=icons.get('delete'),
                   compound=tk.LEFT, command=self.delete_product).pack(side=tk.LEFT, padx=5)
         
-        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_rowconfigure(1, weight=1)
         frame.grid_columnconfigure(0, weight=1)
         self.refresh_inventory()
 
@@ -243,47 +736,191 @@ class RetailManagementApp:
         frame = ttk.Frame(self.tab_sales, padding=20)
         frame.pack(expand=1, fill=tk.BOTH)
 
+        # Barcode scanners type the code followed by Return.
+        ttk.Label(frame, text="Scan Barcode:").grid(row=0, column=0, padx=10, pady=10, sticky=tk.W)
+        self.scan_entry = ttk.Entry(frame, width=40)
+        self.scan_entry.bind('<Return>', self.on_scan)
+        self.scan_entry.grid(row=0, column=1, padx=10, pady=10, sticky=tk.W)
+
         # Product Selection
-        ttk.Label(frame, text="Select Product:").grid(row=0, column=0, padx=10, pady=10, sticky=tk.W)
-        self.sale_product = ttk.Combobox(frame, state='readonly', width=40)
-        self.sale_product.grid(row=0, column=1, padx=10, pady=10)
+        ttk.Label(frame, text="Select Product:").grid(row=1, column=0, padx=10, pady=10, sticky=tk.W)
+        self.sale_product = ttk.Combobox(frame, width=40)
+        self.sale_product.bind('<KeyRelease>', self.on_sale_product_key)
+        self.sale_product.grid(row=1, column=1, padx=10, pady=10, sticky=tk.W)
 
         # Quantity
-        ttk.Label(frame, text="Quantity:").grid(row=1, column=0, padx=10, pady=10, sticky=tk.W)
+        ttk.Label(frame, text="Quantity:").grid(row=2, column=0, padx=10, pady=10, sticky=tk.W)
         self.sale_quantity = ttk.Entry(frame, width=20)
-        self.sale_quantity.grid(row=1, column=1, padx=10, pady=10, sticky=tk.W)
+        self.sale_quantity.grid(row=2, column=1, padx=10, pady=10, sticky=tk.W)
+
+        ttk.Button(frame, text="Add to Cart", command=self.add_to_cart).grid(
+            row=2, column=1, padx=10, pady=10, sticky=tk.E)
+
+        # Cart
+        columns = ('ID', 'Product', 'Qty', 'Status')
+        self.cart_tree = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for col in columns:
+            self.cart_tree.heading(col, text=col)
+            self.cart_tree.column(col, width=120, anchor=tk.CENTER)
+        self.cart_tree.column('Product', width=260)
+        self.cart_tree.tag_configure('failed', background='#f8d7da')
+        self.cart_tree.grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky=tk.NSEW)
+
+        btn_frame = ttk.Frame(frame)
+        btn_frame.grid(row=4, column=0, columnspan=2, sticky=tk.E)
+        ttk.Button(btn_frame, text="Remove Line", command=self.remove_cart_line).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Clear Cart", command=self.clear_cart).pack(side=tk.LEFT, padx=5)
 
         # Process Sale
-        ttk.Button(frame, text="Process Sale", image=self.icons['sale'],
-                  compound=tk.LEFT, command=self.process_sale).grid(row=2, column=1, pady=20, sticky=tk.E)
+        self.sale_button = ttk.Button(btn_frame, text="Process Sale", image=icons.get('sale'),
+                                      compound=tk.LEFT, command=self.process_sale)
+        self.sale_button.pack(side=tk.LEFT, padx=5)
 
+        frame.grid_rowconfigure(3, weight=1)
+        frame.grid_columnconfigure(1, weight=1)
         self.refresh_products()
 
     def create_reports_tab(self):
         frame = ttk.Frame(self.tab_reports)
         frame.pack(expand=1, fill=tk.BOTH, padx=20, pady=20)
 
-        columns = ('ID', 'Product', 'Qty Sold', 'Total', 'Date')
-        self.report_tree = ttk.Treeview(frame, columns=columns, show='headings')
+        # Date range filter
+        filter_frame = ttk.Frame(frame)
+        filter_frame.grid(row=0, column=0, sticky=tk.W, pady=(0, 10))
+        ttk.Label(filter_frame, text="From:").pack(side=tk.LEFT)
+        self.report_start = ttk.Entry(filter_frame, width=12)
+        self.report_start.pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, text="To:").pack(side=tk.LEFT)
+        self.report_end = ttk.Entry(filter_frame, width=12)
+        self.report_end.pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Apply", command=self.refresh_dashboard).pack(side=tk.LEFT, padx=5)
+        for text, days in (("Today", 0), ("7 Days", 6), ("30 Days", REPORT_DEFAULT_DAYS),
+                           ("All Time", None)):
+            ttk.Button(filter_frame, text=text,
+                       command=lambda days=days: self.set_report_range(days)).pack(side=tk.LEFT, padx=2)
+
+        # KPIs
+        kpi_frame = ttk.Frame(frame)
+        kpi_frame.grid(row=1, column=0, sticky=tk.EW, pady=(0, 10))
+        self.kpi_labels = {}
+        for col, (key, title) in enumerate((('revenue', "Revenue"), ('units', "Units Sold"),
+                                            ('baskets', "Baskets"), ('average_basket', "Avg Basket"))):
+            ttk.Label(kpi_frame, text=title).grid(row=0, column=col, padx=20)
+            self.kpi_labels[key] = ttk.Label(kpi_frame, text="-", font=('Arial', 16, 'bold'),
+                                             foreground='#2c3e50')
+            self.kpi_labels[key].grid(row=1, column=col, padx=20)
+
+        # Top products and revenue per day
+        summary_frame = ttk.Frame(frame)
+        summary_frame.grid(row=2, column=0, sticky=tk.EW, pady=(0, 10))
+        self.top_products_tree = ttk.Treeview(summary_frame, columns=('Product', 'Units', 'Revenue'),
+                                              show='headings', height=6)
+        self.daily_revenue_tree = ttk.Treeview(summary_frame, columns=('Date', 'Units', 'Revenue'),
+                                               show='headings', height=6)
+        for tree in (self.top_products_tree, self.daily_revenue_tree):
+            for col in tree['columns']:
+                tree.heading(col, text=col)
+                tree.column(col, width=150, anchor=tk.CENTER)
+        self.top_products_tree.pack(side=tk.LEFT, expand=1, fill=tk.X, padx=(0, 10))
+        daily_vsb = ttk.Scrollbar(summary_frame, orient=tk.VERTICAL,
+                                  command=self.daily_revenue_tree.yview)
+        self.daily_revenue_tree.configure(yscroll=daily_vsb.set)
+        self.daily_revenue_tree.pack(side=tk.LEFT, expand=1, fill=tk.X)
+        daily_vsb.pack(side=tk.LEFT, fill=tk.Y)
+
+        # Rows carry the sale's ts after the shown columns, as sort key.
+        columns = ('ID', 'Product', 'Qty Sold', 'Total', 'Sold At')
+        self.report_tree = VirtualTreeview(frame, columns,
+                                           lambda: count_sales(*self.report_list_range),
+                                           self.fetch_report_rows,
+                                           sort_key=lambda row: (row[5], row[0]),
+                                           descending=True, submit=self.db_worker.submit)
         for col in columns:
             self.report_tree.heading(col, text=col)
             self.report_tree.column(col, width=150, anchor=tk.CENTER)
         
-        vsb = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.report_tree.yview)
-        self.report_tree.configure(yscroll=vsb.set)
+        self.report_tree.grid(row=3, column=0, sticky=tk.NSEW)
         
-        self.report_tree.grid(row=0, column=0, sticky=tk.NSEW)
-        vsb.grid(row=0, column=1, sticky=tk.NS)
-        
-        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_rowconfigure(3, weight=1)
         frame.grid_columnconfigure(0, weight=1)
+        self.report_range = self.fill_report_range(REPORT_DEFAULT_DAYS)
         self.refresh_reports()
 
+    def create_diagnostics_tab(self):
+        frame = ttk.Frame(self.tab_diagnostics)
+        frame.pack(expand=1, fill=tk.BOTH, padx=20, pady=20)
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=0, column=0, sticky=tk.W, pady=(0, 10))
+        ttk.Button(button_frame, text="Refresh", command=self.refresh_diagnostics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Reset", command=self.reset_diagnostics).pack(side=tk.LEFT, padx=5)
+        slow_note = (f"Calls over {profiling.SLOW_MS:g} ms are logged to "
+                     f"{profiling.slow_log_path()}")
+        if not profiling.TRACING:
+            slow_note += " (RETAIL_PROFILING=trace adds their statements and plans)"
+        ttk.Label(button_frame, text=slow_note).pack(side=tk.LEFT, padx=10)
+
+        # Per data function, then per named statement
+        self.calls_tree = ttk.Treeview(frame, columns=('Function', 'Calls', 'Mean ms', 'p95 ms',
+                                                       'Max ms', 'Rows', 'VM Steps'),
+                                       show='headings', height=8)
+        self.statements_tree = ttk.Treeview(frame, columns=('Statement', 'Executions',
+                                                            'Mean ms', 'Total ms'),
+                                            show='headings', height=6)
+        for tree in (self.calls_tree, self.statements_tree):
+            for col in tree['columns']:
+                tree.heading(col, text=col)
+                tree.column(col, width=110, anchor=tk.CENTER)
+            tree.column(tree['columns'][0], width=220, anchor=tk.W)
+        self.calls_tree.grid(row=1, column=0, sticky=tk.NSEW, pady=(0, 10))
+        self.statements_tree.grid(row=2, column=0, sticky=tk.NSEW, pady=(0, 10))
+
+        # Recent slow calls with their query plans
+        self.slow_text = tk.Text(frame, height=10, wrap=tk.NONE, font=('Courier', 9))
+        self.slow_text.grid(row=3, column=0, sticky=tk.NSEW)
+
+        frame.grid_rowconfigure(3, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+        self.refresh_diagnostics()
+
+    def toggle_diagnostics(self, event=None):
+        if self.tabs.tab(self.tab_diagnostics, 'state') == 'hidden':
+            self.tabs.tab(self.tab_diagnostics, state='normal')
+            self.tabs.select(self.tab_diagnostics)
+        else:
+            self.tabs.hide(self.tab_diagnostics)
+
+    # The stats live in memory, so this is cheap enough for the Tk thread.
+    def refresh_diagnostics(self):
+        if not self.is_built(self.tab_diagnostics):
+            return
+        self.calls_tree.delete(*self.calls_tree.get_children())
+        for name, call in profiling.stats().items():
+            self.calls_tree.insert('', tk.END, values=(
+                name, call['calls'], f"{call['mean_ms']:.2f}", f"{call['p95_ms']:.2f}",
+                f"{call['max_ms']:.2f}", call['rows'],
+                f"{call['steps']:,}" if profiling.TRACING else '-'))
+        self.statements_tree.delete(*self.statements_tree.get_children())
+        for name, statement in queries.stats().items():
+            self.statements_tree.insert('', tk.END, values=(
+                name, statement['count'], f"{statement['mean_ms']:.3f}",
+                f"{statement['total_ms']:.1f}"))
+        self.slow_text.delete('1.0', tk.END)
+        self.slow_text.insert(tk.END, '\n\n'.join(
+            profiling.format_slow(entry) for entry in reversed(profiling.recent_slow))
+            or "No slow calls yet.")
+
+    def reset_diagnostics(self):
+        profiling.reset()
+        queries.reset()
+        self.refresh_diagnostics()
+
     # Business Logic
     def add_product(self):
         name = self.product_name.get().strip()
         price = self.product_price.get().strip()
         qty = self.product_quantity.get().strip()
+        sku = self.product_sku.get().strip()
 
         if not all([name, price, qty]):
             messagebox.showerror("Error", "All fields are required!")
@@ -298,74 +935,354 @@ class RetailManagementApp:
             messagebox.showerror("Error", "Invalid price or quantity!")
             return
 
-        success, msg = add_product(name, price, qty)
+        self.add_button.state(['disabled'])
+        self.db_worker.submit(add_product, name, price, qty, sku,
+                              on_success=self.on_product_added,
+                              on_error=self.on_product_add_failed)
+
+    def on_product_added(self, result):
+        self.add_button.state(['!disabled'])
+        success, msg = result
         if success:
             messagebox.showinfo("Success", msg)
             self.product_name.delete(0, tk.END)
             self.product_price.delete(0, tk.END)
             self.product_quantity.delete(0, tk.END)
+            self.product_sku.delete(0, tk.END)
             self.refresh_inventory()
             self.refresh_products()
         else:
             messagebox.showerror("Error", msg)
 
+    def on_product_add_failed(self, error):
+        self.add_button.state(['!disabled'])
+        self.show_db_error(error)
+
     def delete_product(self):
         selected = self.inventory_tree.selection()
-        if not selected:
+        # The remembered selection may be a row no longer in the list.
+        if not selected or not self.inventory_tree.exists(selected[0]):
             messagebox.showwarning("Warning", "Please select a product!")
             return
 
-        product_id = self.inventory_tree.item(selected[0])['values'][0]
+        product_id = int(selected[0])
         if messagebox.askyesno("Confirm", "Delete this product?"):
-            delete_product(product_id)
-            self.refresh_inventory()
-            self.refresh_products()
+            self.db_worker.submit(delete_product, product_id,
+                                  on_success=self.on_product_deleted)
 
-    def process_sale(self):
+    def on_product_deleted(self, result):
+        self.refresh_inventory()
+        self.refresh_products()
+
+    def read_sale_line(self):
         product = self.sale_product.get()
         qty = self.sale_quantity.get().strip()
 
         if not product or not qty:
             messagebox.showerror("Error", "Select a product and enter quantity!")
-            return
+            return None
+
+        match = self.sale_matches.get(product)
+        if match is None:
+            messagebox.showerror("Error", "Select a product from the list!")
+            return None
 
         try:
-            product_id = int(product.split(' - ')[0])
             qty = int(qty)
             if qty <= 0:
                 raise ValueError
         except ValueError:
             messagebox.showerror("Error", "Invalid quantity!")
+            return None
+        return match[0], match[1], qty
+
+    def add_to_cart(self):
+        line = self.read_sale_line()
+        if line is None:
+            return
+        self.add_cart_line(*line)
+        self.sale_quantity.delete(0, tk.END)
+
+    def add_cart_line(self, product_id, label, qty):
+        # Repeat scans of the same product bump its quantity.
+        for index, line in enumerate(self.cart):
+            if line[0] == product_id:
+                qty += line[2]
+                self.cart[index] = (product_id, label, qty)
+                item = self.cart_tree.get_children()[index]
+                self.cart_tree.item(item, values=(product_id, label, qty, ''), tags=())
+                return
+        self.cart.append((product_id, label, qty))
+        self.cart_tree.insert('', tk.END, values=(product_id, label, qty, ''))
+
+    def on_scan(self, event):
+        code = self.scan_entry.get().strip()
+        self.scan_entry.delete(0, tk.END)
+        if not code:
             return
+        self.db_worker.submit(lookup_product_by_code, code,
+                              on_success=lambda product: self.on_scanned(code, product))
+
+    def on_scanned(self, code, product):
+        if product is None:
+            self.root.bell()
+            messagebox.showerror("Error", f"No product with barcode {code}!")
+            self.scan_entry.focus_set()
+            return
+        self.add_cart_line(product[0], self.product_label(product), 1)
+
+    def remove_cart_line(self):
+        for item in self.cart_tree.selection():
+            index = self.cart_tree.index(item)
+            del self.cart[index]
+            self.cart_tree.delete(item)
 
-        success, msg = process_sale(product_id, qty)
+    def clear_cart(self):
+        self.cart = []
+        self.cart_tree.delete(*self.cart_tree.get_children())
+
+    def process_sale(self):
+        # With an empty cart, the product and quantity fields are sold as a
+        # one-line cart.
+        if not self.cart:
+            self.add_to_cart()
+            if not self.cart:
+                return
+
+        lines = [(product_id, qty) for product_id, _, qty in self.cart]
+        self.sale_button.state(['disabled'])
+        self.db_worker.submit(process_sale_batch, lines,
+                              on_success=self.on_sale_processed,
+                              on_error=self.on_sale_failed)
+
+    def on_sale_processed(self, result):
+        self.sale_button.state(['!disabled'])
+        success, msg, failures = result
         if success:
             messagebox.showinfo("Success", msg)
+            self.clear_cart()
             self.sale_quantity.delete(0, tk.END)
             self.refresh_inventory()
             self.refresh_products()
             self.refresh_reports()
         else:
+            reasons = dict(failures)
+            for index, item in enumerate(self.cart_tree.get_children()):
+                reason = reasons.get(index, '')
+                values = self.cart_tree.item(item)['values'][:3]
+                self.cart_tree.item(item, values=(*values, reason),
+                                    tags=('failed',) if reason else ())
             messagebox.showerror("Error", msg)
 
+    def on_sale_failed(self, error):
+        self.sale_button.state(['!disabled'])
+        self.show_db_error(error)
+
+    def show_db_error(self, error):
+        messagebox.showerror("Error", str(error))
+
+    def set_busy(self, busy):
+        if busy:
+            self.status_label.configure(text="Loading...")
+            self.status_progress.pack(side=tk.LEFT, padx=10)
+            self.status_progress.start(10)
+        else:
+            self.status_label.configure(text="")
+            self.status_progress.stop()
+            self.status_progress.pack_forget()
+
     # Refresh Methods
+    # Each refresh loads on the DB worker only the change_log entries its view
+    # has not applied yet, then patches the view back on the Tk thread.
+    # pending_changes() returns None when a full reload is needed.
+    def pending_changes(self, view, table_names):
+        since = self.change_seq.get(view)
+        latest = latest_change_seq()
+        changes = None if since is None else get_changes(since, table_names)
+        if changes and changes[-1][0] > latest:
+            latest = changes[-1][0]
+        self.change_seq[view] = latest
+        return changes
+
     def refresh_inventory(self):
-        for item in self.inventory_tree.get_children():
-            self.inventory_tree.delete(item)
-        for product in get_all_products():
-            self.inventory_tree.insert('', tk.END, values=product)
+        if not self.is_built(self.tab_inventory):
+            return
+        self.db_worker.submit(self.load_inventory_changes, self.inventory_search.get().strip(),
+                              on_success=self.apply_inventory_changes)
 
+    # Returns (total, changes, matches); matches is the search result list
+    # while the inventory filter is in use.
+    def load_inventory_changes(self, search):
+        if search:
+            # Reload in full once the filter is cleared.
+            self.change_seq.pop('inventory', None)
+            matches = search_products(search, INVENTORY_SEARCH_LIMIT)
+            return len(matches), None, matches
+        changes = self.pending_changes('inventory', ('products',))
+        if changes is None:
+            return count_products(), None, None
+        inserted, updated, deleted = summarize_changes(changes, 'products')
+        return None, (get_products_by_ids(inserted), get_products_by_ids(updated), deleted), None
+
+    def apply_inventory_changes(self, result):
+        total, changes, matches = result
+        self.inventory_matches = matches
+        if changes is None:
+            self.inventory_tree.refresh(total)
+        elif any(changes):
+            self.inventory_tree.apply_changes(*changes)
+
+    # The POS picker only ever holds the top search matches; refreshing
+    # re-runs the current search so stock counts stay current.
     def refresh_products(self):
-        products = get_all_products()
-        self.sale_product['values'] = [f"{p[0]} - {p[1]} (Stock: {p[3]})" for p in products]
+        if not self.is_built(self.tab_sales):
+            return
+        self.search_sale_products()
+
+    def on_sale_product_key(self, event):
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        self.debounce('sale_search', SEARCH_DEBOUNCE_MS, self.search_sale_products)
+
+    def search_sale_products(self):
+        text = self.sale_product.get()
+        if text in self.sale_matches:
+            # A picked entry: search by its id so it stays in the list.
+            text = str(self.sale_matches[text][0])
+        self.db_worker.submit(search_products, text, on_success=self.apply_sale_matches)
+
+    def apply_sale_matches(self, rows):
+        current = self.sale_matches.get(self.sale_product.get())
+        self.sale_matches = {self.product_label(p): p for p in rows}
+        self.sale_product['values'] = list(self.sale_matches)
+        if current is not None:
+            # Keep the picked product selected, with its refreshed label.
+            for label, p in self.sale_matches.items():
+                if p[0] == current[0]:
+                    self.sale_product.set(label)
+                    break
+            else:
+                self.sale_product.set('')
+
+    def product_label(self, product):
+        return f"{product[0]} - {product[1]} (Stock: {product[3]})"
+
+    def debounce(self, key, delay_ms, callback):
+        pending = self.pending_after.pop(key, None)
+        if pending is not None:
+            self.root.after_cancel(pending)
+        def run():
+            self.pending_after.pop(key, None)
+            callback()
+        self.pending_after[key] = self.root.after(delay_ms, run)
 
     def refresh_reports(self):
-        for item in self.report_tree.get_children():
-            self.report_tree.delete(item)
-        for sale in get_all_sales():
-            self.report_tree.insert('', tk.END, values=sale)
+        if not self.is_built(self.tab_reports):
+            return
+        self.db_worker.submit(self.load_report_changes, self.report_range,
+                              on_success=self.apply_report_changes)
+        self.refresh_dashboard()
+
+    def set_report_range(self, days):
+        self.fill_report_range(days)
+        self.refresh_dashboard()
+
+    # Puts the last days + 1 days (all time for None) in the date fields and
+    # returns them as a report range.
+    def fill_report_range(self, days):
+        self.report_start.delete(0, tk.END)
+        self.report_end.delete(0, tk.END)
+        if days is None:
+            return None, None
+        # Sales are dated from ledger.now_ts(), in UTC.
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        start = (today - datetime.timedelta(days=days)).isoformat()
+        self.report_start.insert(0, start)
+        self.report_end.insert(0, today.isoformat())
+        return start, today.isoformat()
+
+    def refresh_dashboard(self):
+        dates = []
+        for entry in (self.report_start, self.report_end):
+            value = entry.get().strip()
+            try:
+                dates.append(datetime.date.fromisoformat(value).isoformat() if value else None)
+            except ValueError:
+                messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format!")
+                return
+        dates = tuple(dates)
+        if dates != self.report_range:
+            # The sales list follows the range; reload it in full.
+            self.report_range = dates
+            self.change_seq.pop('reports', None)
+            self.db_worker.submit(self.load_report_changes, dates,
+                                  on_success=self.apply_report_changes)
+        self.db_worker.submit(get_sales_summary, *dates,
+                              on_success=self.apply_dashboard)
+
+    def apply_dashboard(self, summary):
+        self.kpi_labels['revenue'].configure(text=f"${summary['revenue']:,.2f}")
+        self.kpi_labels['units'].configure(text=f"{summary['units']:,}")
+        self.kpi_labels['baskets'].configure(text=f"{summary['baskets']:,}")
+        self.kpi_labels['average_basket'].configure(text=f"${summary['average_basket']:,.2f}")
+        self.top_products_tree.delete(*self.top_products_tree.get_children())
+        for product_id, name, units, revenue in summary['top_products']:
+            self.top_products_tree.insert('', tk.END, values=(
+                name or f"#{product_id} (deleted)", units, f"{revenue:.2f}"))
+        self.daily_revenue_tree.delete(*self.daily_revenue_tree.get_children())
+        for date, units, revenue in summary['daily']:
+            self.daily_revenue_tree.insert('', tk.END, values=(date, units, f"{revenue:.2f}"))
+
+    # Returns (total, changes, date range loaded).
+    def load_report_changes(self, report_range):
+        changes = self.pending_changes('reports', ('sales', 'products'))
+        inserted, updated, deleted = summarize_changes(changes or [], 'sales')
+        # Deleting a product hides its sales from the joined report rows;
+        # with a date range set, a deleted sale may not have been listed.
+        if (changes is None or summarize_changes(changes, 'products')[2]
+                or (deleted and report_range != (None, None))):
+            return count_sales(*report_range), None, report_range
+        start_ts, end_ts = ledger.date_range_ts(*report_range)
+        def listed(rows):
+            return [row for row in rows
+                    if (start_ts is None or row[5] >= start_ts)
+                    and (end_ts is None or row[5] < end_ts)]
+        return None, (listed(get_sales_by_ids(inserted)), listed(get_sales_by_ids(updated)),
+                      deleted), report_range
+
+    def apply_report_changes(self, result):
+        total, changes, self.report_list_range = result
+        if changes is None:
+            self.report_tree.refresh(total)
+        elif any(changes):
+            self.report_tree.apply_changes(*changes)
+
+    # Row sources for the virtual Treeviews, run on the DB worker: keyset
+    # from the previous row while scrolling, OFFSET only when jumping with
+    # the scrollbar.
+    def fetch_inventory_rows(self, offset, limit, previous):
+        if self.inventory_matches is not None:
+            return self.inventory_matches[offset:offset + limit]
+        if previous:
+            return get_products_page(previous[0], limit)
+        return get_products_page(limit=limit, offset=offset)
+
+    def fetch_report_rows(self, offset, limit, previous):
+        start_date, end_date = self.report_list_range
+        if previous:
+            return get_sales_page(previous[5], previous[0], limit,
+                                  start_date=start_date, end_date=end_date)
+        return get_sales_page(limit=limit, offset=offset,
+                              start_date=start_date, end_date=end_date)
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = RetailManagementApp(root)
-    root.mainloop()
\ No newline at end of file
+    try:
+        root.mainloop()
+    finally:
+        if app.snapshots:
+            app.snapshots.stop()
+        app.maintenance.stop()
+        app.db_worker.shutdown()
+        db.close_pool()
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""Versioned schema migrations, applied in order by create_database()."""
+import sqlite3
+
+PRODUCT_FTS_SCRIPT = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, content='products', content_rowid='id', prefix='2 3'
+    );
+    INSERT INTO products_fts (products_fts) VALUES ('rebuild');
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_insert AFTER INSERT ON products
+    BEGIN
+        INSERT INTO products_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_delete AFTER DELETE ON products
+    BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_products_fts_update AFTER UPDATE OF name ON products
+    BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+        INSERT INTO products_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+'''
+
+
+def _product_search_index(conn):
+    # FTS5 is optional in SQLite builds; without it, search falls back to a
+    # case-insensitive prefix range over this index.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_products_name_nocase '
+                 'ON products (name COLLATE NOCASE)')
+    options = {row[0] for row in conn.execute('PRAGMA compile_options')}
+    if 'ENABLE_FTS5' in options:
+        run_script(conn, PRODUCT_FTS_SCRIPT)
+
+
+SALES_LEDGER_SCRIPT = '''
+    -- Dropped by _sales_timestamps() for the backfill.
+    CREATE TRIGGER IF NOT EXISTS trg_sales_update AFTER UPDATE ON sales
+    BEGIN
+        INSERT INTO change_log (table_name, row_id, op) VALUES ('sales', NEW.id, 'update');
+    END;
+    -- For writers that only set a date; the app always sets ts itself.
+    CREATE TRIGGER IF NOT EXISTS trg_sales_default_ts AFTER INSERT ON sales
+    WHEN NEW.ts IS NULL
+    BEGIN
+        UPDATE sales
+        SET ts = COALESCE(CAST(strftime('%s', NEW.date) AS INTEGER) * 1000000,
+                          CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER))
+        WHERE id = NEW.id;
+    END;
+    CREATE INDEX IF NOT EXISTS idx_sales_ts
+        ON sales (ts, id, product_id, quantity_sold, total_price, date);
+    DROP INDEX IF EXISTS idx_sales_report;
+    CREATE TABLE IF NOT EXISTS sales_partitions (
+        name TEXT PRIMARY KEY,
+        month TEXT NOT NULL UNIQUE,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL
+    );
+    CREATE VIEW IF NOT EXISTS sales_ledger AS
+        SELECT id, product_id, quantity_sold, total_price, date, basket_id, ts FROM sales;
+'''
+
+
+def _sales_timestamps(conn):
+    conn.execute('ALTER TABLE sales ADD COLUMN ts INTEGER')
+    # Backfilling through trg_sales_update would log every row as changed.
+    # Rows that only have a date are placed at midnight UTC.
+    conn.execute('DROP TRIGGER IF EXISTS trg_sales_update')
+    conn.execute('''
+        UPDATE sales
+        SET ts = COALESCE(CAST(strftime('%s', date) AS INTEGER) * 1000000, 0)
+    ''')
+    run_script(conn, SALES_LEDGER_SCRIPT)
+
+
+# (version, name, script).  A script is SQL text or a callable taking the
+# connection.  Append new migrations; never edit or reorder ones that have
+# shipped.
+MIGRATIONS = [
+    (1, 'index sales by product', '''
+        CREATE INDEX IF NOT EXISTS idx_sales_product_id ON sales (product_id);
+    '''),
+    (2, 'index sales by date', '''
+        CREATE INDEX IF NOT EXISTS idx_sales_date ON sales (date);
+    '''),
+    # Serves the Sales Analytics query (ORDER BY date DESC, id DESC) straight
+    # from the index; it leads with date, so it supersedes idx_sales_date.
+    (3, 'covering index for sales report', '''
+        CREATE INDEX IF NOT EXISTS idx_sales_report
+            ON sales (date, id, product_id, quantity_sold, total_price);
+        DROP INDEX IF EXISTS idx_sales_date;
+    '''),
+    # Row-level change log so views can apply only what changed since the
+    # last sequence number they saw.
+    (4, 'change log for products and sales', '''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL
+        );
+        CREATE TRIGGER IF NOT EXISTS trg_products_insert AFTER INSERT ON products
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('products', NEW.id, 'insert');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_products_update AFTER UPDATE ON products
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('products', NEW.id, 'update');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_products_delete AFTER DELETE ON products
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('products', OLD.id, 'delete');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_insert AFTER INSERT ON sales
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('sales', NEW.id, 'insert');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_update AFTER UPDATE ON sales
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('sales', NEW.id, 'update');
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_delete AFTER DELETE ON sales
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('sales', OLD.id, 'delete');
+        END;
+    '''),
+    # Per-day, per-product totals kept in step with sales by triggers, so
+    # every write path (single sale, cart, imports) maintains them in the
+    # same transaction.  Deleting sales rows deliberately leaves the rollup
+    # alone: archived history stays reportable.
+    (5, 'daily sales rollup', '''
+        CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+            date TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (date, product_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_sales_daily_rollup_product
+            ON sales_daily_rollup (product_id, date);
+        INSERT INTO sales_daily_rollup (date, product_id, units, revenue)
+            SELECT date, product_id, SUM(quantity_sold), SUM(total_price)
+            FROM sales
+            WHERE date IS NOT NULL AND product_id IS NOT NULL
+            GROUP BY date, product_id;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_insert AFTER INSERT ON sales
+        WHEN NEW.date IS NOT NULL AND NEW.product_id IS NOT NULL
+        BEGIN
+            INSERT INTO sales_daily_rollup (date, product_id, units, revenue)
+            VALUES (NEW.date, NEW.product_id, NEW.quantity_sold, NEW.total_price)
+            ON CONFLICT (date, product_id) DO UPDATE
+            SET units = units + excluded.units,
+                revenue = revenue + excluded.revenue;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_update
+        AFTER UPDATE OF date, product_id, quantity_sold, total_price ON sales
+        BEGIN
+            UPDATE sales_daily_rollup
+            SET units = units - OLD.quantity_sold,
+                revenue = revenue - OLD.total_price
+            WHERE date = OLD.date AND product_id = OLD.product_id;
+            INSERT INTO sales_daily_rollup (date, product_id, units, revenue)
+            SELECT NEW.date, NEW.product_id, NEW.quantity_sold, NEW.total_price
+            WHERE NEW.date IS NOT NULL AND NEW.product_id IS NOT NULL
+            ON CONFLICT (date, product_id) DO UPDATE
+            SET units = units + excluded.units,
+                revenue = revenue + excluded.revenue;
+        END;
+    '''),
+    # One row per checkout, so average basket can be computed; earlier
+    # sales were single-product checkouts and count as one basket each.
+    (6, 'baskets and daily basket counts', '''
+        CREATE TABLE IF NOT EXISTS baskets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            lines INTEGER NOT NULL,
+            total_price REAL NOT NULL
+        );
+        ALTER TABLE sales ADD COLUMN basket_id INTEGER REFERENCES baskets (id);
+        CREATE TABLE IF NOT EXISTS baskets_daily_rollup (
+            date TEXT PRIMARY KEY,
+            baskets INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        INSERT INTO baskets_daily_rollup (date, baskets)
+            SELECT date, COUNT(*)
+            FROM sales
+            WHERE date IS NOT NULL
+            GROUP BY date;
+        CREATE TRIGGER IF NOT EXISTS trg_baskets_rollup_insert AFTER INSERT ON baskets
+        BEGIN
+            INSERT INTO baskets_daily_rollup (date, baskets)
+            VALUES (NEW.date, 1)
+            ON CONFLICT (date) DO UPDATE SET baskets = baskets + 1;
+        END;
+    '''),
+    (7, 'product name search index', _product_search_index),
+    (8, 'product sku / barcode', '''
+        ALTER TABLE products ADD COLUMN sku TEXT;
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_products_sku ON products (sku);
+    '''),
+    # Sub-second sale times, ordered and range-filtered through idx_sales_ts
+    # (which supersedes idx_sales_report), and the registry of the monthly
+    # partitions ledger.rotate() creates.
+    (9, 'sales timestamps and ledger partitions', _sales_timestamps),
+    # Which file a partition lives in: 'main', or 'archive' once
+    # ledger.archive() has moved it to the attached cold-storage database.
+    (10, 'sales partition location', '''
+        ALTER TABLE sales_partitions ADD COLUMN db TEXT NOT NULL DEFAULT 'main';
+    '''),
+]
+
+
+def split_statements(script):
+    statements, current = [], ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ''
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+
+def run_script(conn, script):
+    for statement in split_statements(script):
+        conn.execute(statement)
+
+
+def current_version(conn):
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def upgrade(conn, migrations=MIGRATIONS):
+    """Apply every pending migration; returns the versions applied."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+    applied = []
+    for version, name, script in sorted(migrations, key=lambda m: m[0]):
+        if version <= current_version(conn):
+            continue
+        # BEGIN IMMEDIATE serialises registers starting at the same time;
+        # re-check the version once we hold the write lock.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= current_version(conn):
+                conn.rollback()
+                continue
+            if callable(script):
+                script(conn)
+            else:
+                run_script(conn, script)
+            conn.execute('''
+                INSERT INTO schema_version (version, name, applied_at)
+                VALUES (?, ?, DATETIME("now"))
+            ''', (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
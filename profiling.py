@@ -0,0 +1,256 @@
+"""Per-call profiling of the data layer, with a slow-query log.
+
+Data functions in main.py are wrapped with @profiled, which keeps a latency
+histogram per function along with the rows it returned.  A call slower than
+SLOW_MS is written to a rotating log beside the database file
+(``<db>_slow_queries.log``, 1 MB x 5 files) and kept in recent_slow for the
+diagnostics tab (Ctrl+Shift+D in the app).
+
+RETAIL_PROFILING=trace also reports what SQLite did for each call, through
+hooks installed on pooled connections with db.add_connect_hook():
+set_trace_callback() collects the statements a call executes (bound values
+expanded) and set_progress_handler() counts virtual machine steps, a
+measure of the work SQLite did whatever the wall time.  Slow calls are then
+logged with EXPLAIN QUERY PLAN for each statement.  The hooks run for every
+statement, trigger steps included, and add about half again to the cost of
+a sale, so they are off by default.
+
+RETAIL_PROFILING=0 turns all of it off; RETAIL_SLOW_MS and RETAIL_SLOW_LOG
+override the threshold and the log file.
+"""
+import collections
+import datetime
+import functools
+import logging
+import logging.handlers
+import os
+import sqlite3
+import threading
+import time
+
+import db
+
+MODE = os.environ.get('RETAIL_PROFILING', '1')
+ENABLED = MODE != '0'
+TRACING = MODE == 'trace'
+SLOW_MS = float(os.environ.get('RETAIL_SLOW_MS', 250))
+# None: beside the database file, see slow_log_path().
+SLOW_LOG = os.environ.get('RETAIL_SLOW_LOG')
+SLOW_LOG_BYTES = 1024 * 1024
+SLOW_LOG_FILES = 5
+# Upper bounds of the histogram buckets in ms; the last bucket is open.
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+PROGRESS_OPS = 1000
+# Statements kept per call for the slow log, and their text in it.
+MAX_STATEMENTS = 50
+MAX_SQL_CHARS = 500
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+recent_slow = collections.deque(maxlen=50)
+
+_local = threading.local()
+_lock = threading.Lock()
+# function name -> [calls, total ms, max ms, rows, VM steps, bucket counts]
+_calls = {}
+_log = logging.getLogger('retail.slow_queries')
+_log.propagate = False
+_log_handler = None
+
+
+def _frames():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _trace(sql):
+    # Statements run by triggers and virtual tables (FTS5 shadow tables) are
+    # reported too, prefixed with '--'; the caller's own statement covers them.
+    if sql[:2] == '--':
+        return
+    for frame in getattr(_local, 'stack', ()):
+        if len(frame['statements']) < MAX_STATEMENTS:
+            frame['statements'].append(sql)
+
+
+def _progress():
+    for frame in getattr(_local, 'stack', ()):
+        frame['steps'] += PROGRESS_OPS
+    return 0
+
+
+def install(conn):
+    """Report conn's statements and work to the profiled call running on its thread."""
+    conn.set_trace_callback(_trace)
+    conn.set_progress_handler(_progress, PROGRESS_OPS)
+
+
+def _bucket(ms):
+    for index, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return index
+    return len(BUCKETS_MS)
+
+
+def _record(name, ms, rows, steps):
+    with _lock:
+        entry = _calls.get(name)
+        if entry is None:
+            entry = _calls[name] = [0, 0.0, 0.0, 0, 0, [0] * (len(BUCKETS_MS) + 1)]
+        entry[0] += 1
+        entry[1] += ms
+        entry[2] = max(entry[2], ms)
+        entry[3] += rows or 0
+        entry[4] += steps
+        entry[5][_bucket(ms)] += 1
+
+
+def profiled(fn):
+    if not ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        frame = None
+        if TRACING:
+            frame = {'statements': [], 'steps': 0}
+            _frames().append(frame)
+        rows = None
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, list):
+                rows = len(result)
+            return result
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            if frame is not None:
+                _frames().pop()
+            _record(fn.__name__, ms, rows, frame['steps'] if frame else 0)
+            if ms >= SLOW_MS:
+                _slow(fn.__name__, ms, rows, frame)
+
+    return wrapper
+
+
+def _explain(statements):
+    plans = []
+    # EXPLAIN runs outside any profiled frame so it is not traced itself.
+    stack, _local.stack = _frames(), []
+    try:
+        with db.connection() as conn:
+            for sql in dict.fromkeys(statements):
+                words = sql.split(None, 1)
+                if not words or words[0].upper() not in EXPLAINABLE:
+                    continue
+                try:
+                    plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+                except sqlite3.Error as e:
+                    plan = [f'(no plan: {e})']
+                # Leave out the likes of the pool's SELECT 1 health check.
+                if plan != ['SCAN CONSTANT ROW']:
+                    plans.append((sql, plan))
+    finally:
+        _local.stack = stack
+    return plans
+
+
+def _slow(name, ms, rows, frame):
+    plans = []
+    if frame is not None:
+        try:
+            plans = _explain(frame['statements'])
+        except Exception as e:
+            plans = [('', [f'(no plan: {e})'])]
+    entry = {
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'function': name,
+        'ms': ms,
+        'rows': rows,
+        'steps': frame['steps'] if frame else None,
+        'statements': plans,
+    }
+    recent_slow.append(entry)
+    _slow_log().warning(format_slow(entry))
+
+
+def slow_log_path():
+    """SLOW_LOG, or ``<db>_slow_queries.log`` beside the configured database."""
+    if SLOW_LOG:
+        return os.path.abspath(SLOW_LOG)
+    root, _ = os.path.splitext(os.path.abspath(db.get_pool().db_name))
+    return f'{root}_slow_queries.log'
+
+
+def _slow_log():
+    global _log_handler
+    path = slow_log_path()
+    with _lock:
+        # Follows db.configure() to another database.
+        if _log_handler is None or _log_handler.baseFilename != path:
+            if _log_handler is not None:
+                _log.removeHandler(_log_handler)
+                _log_handler.close()
+            # delay: the file appears with the first slow call.
+            _log_handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=SLOW_LOG_BYTES, backupCount=SLOW_LOG_FILES,
+                encoding='utf-8', delay=True)
+            _log_handler.setFormatter(logging.Formatter('%(message)s'))
+            _log.addHandler(_log_handler)
+    return _log
+
+
+def format_slow(entry):
+    rows = '' if entry['rows'] is None else f", {entry['rows']:,} rows"
+    steps = '' if entry['steps'] is None else f", {entry['steps']:,} VM steps"
+    lines = [f"{entry['time']} {entry['function']} {entry['ms']:.1f} ms{rows}{steps}"]
+    for sql, plan in entry['statements']:
+        sql = ' '.join(sql.split())
+        if len(sql) > MAX_SQL_CHARS:
+            sql = sql[:MAX_SQL_CHARS] + '...'
+        lines.append(f"  {sql}")
+        lines.extend(f"    {step}" for step in plan)
+    return '\n'.join(lines)
+
+
+def _percentile(buckets, count, max_ms, q):
+    seen = 0
+    for index, n in enumerate(buckets):
+        seen += n
+        if seen >= q * count:
+            return BUCKETS_MS[index] if index < len(BUCKETS_MS) else max_ms
+    return max_ms
+
+
+def stats():
+    """{function: {calls, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, rows, steps, histogram}},
+    slowest in total first.  Percentiles are bucket upper bounds; steps stay 0
+    unless TRACING."""
+    with _lock:
+        snapshot = {name: (*entry[:5], list(entry[5])) for name, entry in _calls.items()}
+    result = {}
+    for name, (calls, total, max_ms, rows, steps, buckets) in sorted(
+            snapshot.items(), key=lambda item: -item[1][1]):
+        result[name] = {
+            'calls': calls,
+            'mean_ms': total / calls,
+            'p50_ms': min(_percentile(buckets, calls, max_ms, 0.50), max_ms),
+            'p95_ms': min(_percentile(buckets, calls, max_ms, 0.95), max_ms),
+            'p99_ms': min(_percentile(buckets, calls, max_ms, 0.99), max_ms),
+            'max_ms': max_ms,
+            'rows': rows,
+            'steps': steps,
+            'histogram': dict(zip([*BUCKETS_MS, 'more'], buckets)),
+        }
+    return result
+
+
+def reset():
+    with _lock:
+        _calls.clear()
+    recent_slow.clear()
+
+
+if TRACING:
+    db.add_connect_hook(install)
@@ -0,0 +1,187 @@
+"""Named SQL statements for the data layer's hot paths, with per-statement stats.
+
+Each statement's text is fixed, so the statement cache of a pooled
+connection compiles it once and reuses it for the connection's lifetime
+(db.CACHED_STATEMENTS leaves room for all of them next to the queries that
+are built per call, like IN lists and ledger unions).  Optional report
+bounds are passed as NULL instead of changing the WHERE clause; SQLite
+still turns ``date >= COALESCE(?, '')`` into an index range.
+
+execute(), fetchone() and fetchall() run a statement by name and add the
+call, and the time it took including the fetch, to stats().
+"""
+import threading
+import time
+
+STATEMENTS = {
+    # Products
+    'product.insert': '''
+        INSERT INTO products (name, price, quantity, sku)
+        VALUES (?, ?, ?, ?)
+    ''',
+    'product.delete': 'DELETE FROM products WHERE id = ?',
+    'product.page': '''
+        SELECT id, name, price, quantity
+        FROM products
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ? OFFSET ?
+    ''',
+    'product.search': '''
+        SELECT p.id, p.name, p.price, p.quantity
+        FROM products_fts f
+        JOIN products p ON p.id = f.rowid
+        WHERE products_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    ''',
+    'product.search_prefix': '''
+        SELECT id, name, price, quantity
+        FROM products
+        WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE
+        ORDER BY name COLLATE NOCASE
+        LIMIT ?
+    ''',
+    'product.has_search_index': "SELECT 1 FROM sqlite_master WHERE name = 'products_fts'",
+    'product.exists': 'SELECT 1 FROM products WHERE id = ?',
+    'product.price_quantity': 'SELECT price, quantity FROM products WHERE id = ?',
+    'product.set_quantity': 'UPDATE products SET quantity = ? WHERE id = ?',
+
+    # Selling: the stock check is part of the UPDATE
+    'stock.take': '''
+        UPDATE products
+        SET quantity = quantity - ?
+        WHERE id = ? AND quantity >= ?
+        RETURNING price, quantity
+    ''',
+    'stock.take_no_returning': '''
+        UPDATE products
+        SET quantity = quantity - ?
+        WHERE id = ? AND quantity >= ?
+    ''',
+    'stock.decrement': '''
+        UPDATE products
+        SET quantity = quantity - ?
+        WHERE id = ?
+    ''',
+    'basket.insert': '''
+        INSERT INTO baskets (date, lines, total_price)
+        VALUES (?, ?, ?)
+    ''',
+    'sale.insert': '''
+        INSERT INTO sales (product_id, quantity_sold, total_price, date, basket_id, ts)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''',
+
+    # Reports, from the rollups; (start, end) bounds may be NULL
+    'report.revenue_by_day': '''
+        SELECT date AS period, SUM(units), SUM(revenue)
+        FROM sales_daily_rollup
+        WHERE date >= COALESCE(?, '') AND date <= COALESCE(?, '9999-12-31')
+        GROUP BY period
+        ORDER BY period DESC
+    ''',
+    'report.revenue_by_week': '''
+        SELECT strftime('%Y-W%W', date) AS period, SUM(units), SUM(revenue)
+        FROM sales_daily_rollup
+        WHERE date >= COALESCE(?, '') AND date <= COALESCE(?, '9999-12-31')
+        GROUP BY period
+        ORDER BY period DESC
+    ''',
+    'report.revenue_by_month': '''
+        SELECT substr(date, 1, 7) AS period, SUM(units), SUM(revenue)
+        FROM sales_daily_rollup
+        WHERE date >= COALESCE(?, '') AND date <= COALESCE(?, '9999-12-31')
+        GROUP BY period
+        ORDER BY period DESC
+    ''',
+    'report.revenue_by_product': '''
+        SELECT r.product_id, p.name, SUM(r.units) AS units, SUM(r.revenue) AS revenue
+        FROM sales_daily_rollup r
+        LEFT JOIN products p ON p.id = r.product_id
+        WHERE r.date >= COALESCE(?, '') AND r.date <= COALESCE(?, '9999-12-31')
+        GROUP BY r.product_id
+        ORDER BY revenue DESC
+        LIMIT ?
+    ''',
+    'report.totals': '''
+        SELECT COALESCE(SUM(units), 0), COALESCE(SUM(revenue), 0)
+        FROM sales_daily_rollup
+        WHERE date >= COALESCE(?, '') AND date <= COALESCE(?, '9999-12-31')
+    ''',
+    'report.baskets': '''
+        SELECT COALESCE(SUM(baskets), 0)
+        FROM baskets_daily_rollup
+        WHERE date >= COALESCE(?, '') AND date <= COALESCE(?, '9999-12-31')
+    ''',
+
+    # Change tracking
+    'change_log.latest': 'SELECT COALESCE(MAX(seq), 0) FROM change_log',
+    'change_log.oldest': 'SELECT MIN(seq) FROM change_log',
+    'change_log.prune': '''
+        DELETE FROM change_log
+        WHERE seq <= (SELECT MAX(seq) FROM change_log) - ?
+    ''',
+}
+
+_lock = threading.Lock()
+# name -> [executions, seconds]
+_stats = {}
+
+
+def _record(name, seconds):
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            _stats[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+def execute(target, name, params=()):
+    """Run statement ``name`` on a connection or cursor; returns the cursor."""
+    started = time.perf_counter()
+    try:
+        return target.execute(STATEMENTS[name], params)
+    finally:
+        _record(name, time.perf_counter() - started)
+
+
+def executemany(target, name, rows):
+    started = time.perf_counter()
+    try:
+        return target.executemany(STATEMENTS[name], rows)
+    finally:
+        _record(name, time.perf_counter() - started)
+
+
+def fetchone(target, name, params=()):
+    started = time.perf_counter()
+    try:
+        return target.execute(STATEMENTS[name], params).fetchone()
+    finally:
+        _record(name, time.perf_counter() - started)
+
+
+def fetchall(target, name, params=()):
+    started = time.perf_counter()
+    try:
+        return target.execute(STATEMENTS[name], params).fetchall()
+    finally:
+        _record(name, time.perf_counter() - started)
+
+
+def stats():
+    """{name: {'count', 'total_ms', 'mean_ms'}}, slowest in total first."""
+    with _lock:
+        snapshot = {name: tuple(entry) for name, entry in _stats.items()}
+    return {
+        name: {'count': count, 'total_ms': seconds * 1000, 'mean_ms': seconds * 1000 / count}
+        for name, (count, seconds) in sorted(snapshot.items(), key=lambda item: -item[1][1])
+    }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
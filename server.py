@@ -0,0 +1,354 @@
+"""Headless HTTP/JSON API over the retail data layer, for thin register clients.
+
+    python server.py [--host 127.0.0.1] [--port 8080] [--db retail_management.db] [--readers 4]
+                     [--window-ms 2] [--max-batch 64] [--backup-dir DIR --backup-interval 60]
+
+Every write (sales, product changes) runs on a single writer thread that
+holds one pooled connection for its lifetime, so registers never contend
+for SQLite's write lock; single-line sales arriving together are committed
+in one transaction (see writequeue.py).  Reads run on a small thread pool
+with their own connections, which WAL lets proceed alongside the writer.
+
+    GET    /health                          GET    /stats
+    GET    /products?after_id=&limit=       POST   /products  {name, price, quantity, sku}
+    GET    /products/<id>                   DELETE /products/<id>
+    GET    /products/search?q=&limit=
+    GET    /products/code/<sku>
+    GET    /sales?start=&end=&after_ts=&after_id=&limit=
+    POST   /sales  {product_id, quantity} or {lines: [[product_id, quantity], ...]}
+    GET    /reports/summary?start=&end=
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import backup
+import db
+import main as app
+import profiling
+import queries
+from worker import PeriodicTask
+from writequeue import DEFAULT_MAX_BATCH, DEFAULT_WINDOW_MS, WriteQueue
+
+DEFAULT_PORT = 8080
+DEFAULT_READERS = 4
+MAX_BODY = 1024 * 1024
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def product_json(row):
+    return None if row is None else dict(zip(('id', 'name', 'price', 'quantity'), row))
+
+
+def sale_json(row):
+    return dict(zip(('id', 'product', 'quantity_sold', 'total_price', 'sold_at', 'ts'), row))
+
+
+def _int(value, name, default=None):
+    if value is None or value == '':
+        if default is None:
+            raise HTTPError(400, f'{name} is required')
+        return default
+    # JSON true / false would read as 1 / 0, and int() truncates 1.7 to 1.
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise HTTPError(400, f'{name} must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f'{name} must be an integer') from None
+
+
+def _date(value, name):
+    """An optional YYYY-MM-DD query parameter, as ISO text or None."""
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPError(400, f'{name} must be a YYYY-MM-DD date') from None
+
+
+def _limit(query, default):
+    # SQLite reads a negative LIMIT as no limit at all.
+    return max(1, min(_int(query.get('limit'), 'limit', default), app.PAGE_SIZE))
+
+
+class Service:
+    def __init__(self, readers=DEFAULT_READERS, window_ms=DEFAULT_WINDOW_MS,
+                 max_batch=DEFAULT_MAX_BATCH):
+        self.writer = WriteQueue(window_ms, max_batch)
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        self.routes = [
+            ('GET', r'/health', self.health),
+            ('GET', r'/stats', self.stats),
+            ('GET', r'/products', self.list_products),
+            ('POST', r'/products', self.add_product),
+            ('GET', r'/products/search', self.search_products),
+            ('GET', r'/products/code/(?P<code>[^/]+)', self.product_by_code),
+            ('GET', r'/products/(?P<product_id>\d+)', self.get_product),
+            ('DELETE', r'/products/(?P<product_id>\d+)', self.delete_product),
+            ('GET', r'/sales', self.list_sales),
+            ('POST', r'/sales', self.process_sale),
+            ('GET', r'/reports/summary', self.sales_summary),
+        ]
+        self.routes = [(method, re.compile(pattern + '$'), handler)
+                       for method, pattern, handler in self.routes]
+
+    def start(self):
+        self.writer.start()
+
+    def stop(self):
+        self.writer.stop()
+        self.readers.shutdown()
+
+    async def read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, fn, *args)
+
+    async def write(self, fn, *args):
+        return await asyncio.wrap_future(self.writer.submit(fn, *args))
+
+    # Handlers return (status, payload).
+    async def health(self, query, body):
+        return 200, {'ok': True, 'pool': db.get_pool().stats()}
+
+    async def stats(self, query, body):
+        return 200, {'pool': db.get_pool().stats(), 'calls': profiling.stats(),
+                     'queries': queries.stats()}
+
+    async def list_products(self, query, body):
+        after_id = _int(query.get('after_id'), 'after_id', 0)
+        limit = _limit(query, app.PAGE_SIZE)
+        rows = await self.read(app.get_products_page, after_id, limit)
+        return 200, {'products': [product_json(row) for row in rows]}
+
+    async def search_products(self, query, body):
+        limit = _limit(query, app.SEARCH_LIMIT)
+        rows = await self.read(app.search_products, query.get('q', ''), limit)
+        return 200, {'products': [product_json(row) for row in rows]}
+
+    async def product_by_code(self, query, body, code):
+        product = await self.read(app.lookup_product_by_code, unquote(code))
+        if product is None:
+            raise HTTPError(404, 'Product not found.')
+        return 200, product_json(product)
+
+    async def get_product(self, query, body, product_id):
+        product = await self.read(app.get_product, int(product_id))
+        if product is None:
+            raise HTTPError(404, 'Product not found.')
+        return 200, product_json(product)
+
+    async def add_product(self, query, body):
+        if isinstance(body.get('price'), bool):
+            raise HTTPError(400, 'price must be a number')
+        try:
+            name = str(body['name']).strip()
+            price = float(body['price'])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, 'name, price and quantity are required') from None
+        quantity = _int(body.get('quantity'), 'quantity')
+        sku = body.get('sku')
+        if sku is not None and not isinstance(sku, str):
+            raise HTTPError(400, 'sku must be a string')
+        # float() accepts 'nan' and 'inf'; nan would be stored as NULL.
+        if not name or not math.isfinite(price) or price <= 0 or quantity < 0:
+            raise HTTPError(400, 'Invalid price or quantity!')
+        success, msg = await self.write(app.add_product, name, price, quantity, sku)
+        return (201 if success else 409), {'ok': success, 'message': msg}
+
+    async def delete_product(self, query, body, product_id):
+        await self.write(app.delete_product, int(product_id))
+        return 200, {'ok': True}
+
+    async def list_sales(self, query, body):
+        limit = _limit(query, app.PAGE_SIZE)
+        # Pass the ts and id of the last sale of a page to get the next one.
+        after_ts = query.get('after_ts')
+        after_id = query.get('after_id')
+        rows = await self.read(app.get_sales_page,
+                               None if after_ts is None else _int(after_ts, 'after_ts'),
+                               None if after_id is None else _int(after_id, 'after_id'), limit,
+                               0, _date(query.get('start'), 'start'),
+                               _date(query.get('end'), 'end'))
+        return 200, {'sales': [sale_json(row) for row in rows]}
+
+    async def process_sale(self, query, body):
+        if 'lines' in body:
+            try:
+                pairs = [(product_id, quantity) for product_id, quantity in body['lines']]
+            except (TypeError, ValueError):
+                raise HTTPError(400, 'lines must be [product_id, quantity] pairs') from None
+            lines = [(_int(product_id, 'product_id'), _int(quantity, 'quantity'))
+                     for product_id, quantity in pairs]
+            if any(quantity <= 0 for _, quantity in lines):
+                raise HTTPError(400, 'Invalid quantity!')
+            success, msg, failures = await self.write(app.process_sale_batch, lines)
+            return (200 if success else 409), {
+                'ok': success, 'message': msg,
+                'failures': [{'line': index, 'reason': reason} for index, reason in failures],
+            }
+        product_id = _int(body.get('product_id'), 'product_id')
+        quantity = _int(body.get('quantity'), 'quantity')
+        if quantity <= 0:
+            raise HTTPError(400, 'Invalid quantity!')
+        success, msg = await asyncio.wrap_future(self.writer.sell(product_id, quantity))
+        return (200 if success else 409), {'ok': success, 'message': msg}
+
+    async def sales_summary(self, query, body):
+        summary = await self.read(app.get_sales_summary, _date(query.get('start'), 'start'),
+                                  _date(query.get('end'), 'end'))
+        return 200, summary
+
+    # HTTP
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(url.path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            if body:
+                try:
+                    body = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, 'Body must be JSON') from None
+                if not isinstance(body, dict):
+                    raise HTTPError(400, 'Body must be a JSON object')
+            return await handler(query, body or {}, **match.groupdict())
+        if allowed:
+            raise HTTPError(405, 'Method not allowed')
+        raise HTTPError(404, 'Not found')
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # The rest of the stream cannot be trusted; close it.
+                    method, version = None, 'HTTP/1.0'
+                    status, payload = 400, {'ok': False, 'message': 'Malformed request'}
+                if method is not None:
+                    try:
+                        if length > MAX_BODY:
+                            raise HTTPError(413, 'Request body too large')
+                        body = await reader.readexactly(length) if length else b''
+                        status, payload = await self.dispatch(method, target, body)
+                    except HTTPError as e:
+                        status, payload = e.status, {'ok': False, 'message': str(e)}
+                    except Exception as e:
+                        status, payload = 500, {'ok': False, 'message': str(e)}
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1' and status != 413)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+                    .encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, readers=DEFAULT_READERS,
+                window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH, ready=None):
+    service = Service(readers, window_ms, max_batch)
+    service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the retail data layer over HTTP/JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=app.DB_NAME)
+    parser.add_argument('--readers', type=int, default=DEFAULT_READERS)
+    parser.add_argument('--profile', choices=sorted(db.PRAGMA_PROFILES))
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS,
+                        help='how long to collect concurrent sales into one commit')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--backup-dir', help='take rotated snapshots into this directory')
+    parser.add_argument('--backup-interval', type=float, default=backup.DEFAULT_INTERVAL,
+                        help='minutes between snapshots')
+    parser.add_argument('--backup-keep', type=int, default=backup.DEFAULT_KEEP)
+    args = parser.parse_args(argv)
+
+    # One connection for the writer, one per reader thread, one for
+    # maintenance and one for snapshots.
+    db.configure(args.db, size=args.readers + 2 + bool(args.backup_dir), profile=args.profile)
+    app.create_database()
+    # Ledger rotation and change_log pruning, off the startup path and
+    # repeated while serving.
+    maintenance = PeriodicTask(
+        app.maintain_database, app.MAINTENANCE_INTERVAL, delay=0,
+        on_error=lambda e: print(f"Maintenance failed: {e}", file=sys.stderr, flush=True))
+    maintenance.start()
+    snapshots = None
+    if args.backup_dir:
+        snapshots = backup.SnapshotScheduler(
+            args.backup_dir, args.backup_interval, args.backup_keep,
+            on_error=lambda e: print(f"Snapshot failed: {e}", file=sys.stderr, flush=True))
+        snapshots.start()
+
+    def ready(server):
+        for sock in server.sockets:
+            print(f"Serving on http://{sock.getsockname()[0]}:{sock.getsockname()[1]}", flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.readers,
+                          args.window_ms, args.max_batch, ready=ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        maintenance.stop()
+        if snapshots:
+            snapshots.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
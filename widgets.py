@@ -0,0 +1,296 @@
+"""Reusable Tk widgets for the retail GUI."""
+import tkinter as tk
+from tkinter import ttk
+
+# Item id prefix of the placeholder rows shown while a block is fetched.
+PENDING = 'pending:'
+
+
+class VirtualTreeview(ttk.Frame):
+    """A Treeview that only materializes the rows in its viewport.
+
+    Rows come from two callbacks: ``count()`` returns the total number of
+    rows and ``fetch(offset, limit, previous)`` returns up to ``limit`` rows
+    starting at ``offset``.  ``previous`` is the last row of the preceding
+    block when it is cached, so sources can use a keyset cursor instead of
+    an OFFSET scan while the user scrolls sequentially.  Column ``key_index``
+    of each row is used as the item id, and ``sort_key(row)`` (ascending,
+    or descending with ``descending=True``) places rows passed to
+    apply_changes().
+
+    With ``submit(fn, *args, on_success=callback)`` (e.g. DBWorker.submit),
+    blocks are fetched off the Tk thread: rows not loaded yet show as
+    placeholders until their block arrives, and a fetch whose rows have
+    been scrolled past by the time it runs is skipped.  Without it, fetch()
+    is called directly.
+    """
+
+    def __init__(self, master, columns, count, fetch, key_index=0,
+                 sort_key=None, descending=False, submit=None,
+                 block_size=200, max_blocks=8, row_height=25, **kwargs):
+        super().__init__(master, **kwargs)
+        self.count = count
+        self.fetch = fetch
+        self.submit = submit
+        self.key_index = key_index
+        self.sort_key = sort_key or (lambda row: row[key_index])
+        self.descending = descending
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.row_height = row_height
+
+        self.total = 0
+        self.first = 0
+        self.visible = 1
+        self._blocks = {}
+        self._selected = set()
+        # Blocks being fetched; results from before the last refresh or
+        # change are dropped by generation.
+        self._pending = set()
+        self._generation = 0
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings',
+                                 selectmode='browse')
+        self.vsb = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky=tk.NSEW)
+        self.vsb.grid(row=0, column=1, sticky=tk.NS)
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.tag_configure('pending', foreground='#7f8c8d')
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.tree.bind('<Up>', lambda e: self._on_arrow(-1))
+        self.tree.bind('<Down>', lambda e: self._on_arrow(1))
+        self.tree.bind('<Prior>', lambda e: self._scroll_by(-self.visible) or 'break')
+        self.tree.bind('<Next>', lambda e: self._scroll_by(self.visible) or 'break')
+
+    # Treeview passthroughs used by the app
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def selection(self):
+        return tuple(self._selected)
+
+    def item(self, iid, **kwargs):
+        return self.tree.item(iid, **kwargs)
+
+    def exists(self, iid):
+        """Whether the row with item id iid is shown or still cached."""
+        return self.tree.exists(iid) or any(
+            str(row[self.key_index]) == iid for block in self._blocks.values() for row in block)
+
+    def refresh(self, total=None):
+        """Drop cached rows and the selection, and re-read the row count and viewport.
+
+        Pass ``total`` when the count was already computed elsewhere (e.g.
+        on a background thread) to skip calling ``count()``.
+        """
+        self._blocks.clear()
+        self._selected.clear()
+        self._forget_pending()
+        self.total = self.count() if total is None else total
+        self._render()
+
+    def apply_changes(self, inserted=(), updated=(), deleted=()):
+        """Patch the cache with changed rows instead of re-reading the source.
+
+        ``inserted`` and ``updated`` are full rows, ``deleted`` are keys.
+        Rows updated in place are patched; an insert or delete drops the
+        cached blocks from its position on, to be re-fetched on demand.
+        Deleted rows are deselected.  The row count is adjusted without
+        querying ``count()``.
+        """
+        # A block in flight may predate these changes.
+        self._forget_pending()
+        stale = []
+        for key in deleted:
+            self._selected.discard(str(key))
+            found = self._locate(key)
+            # Without the row we cannot tell where it was; drop everything.
+            stale.append(found[0] if found else 0)
+            self.total -= 1
+        for row in updated:
+            found = self._locate(row[self.key_index])
+            if not found:
+                continue
+            index, pos = found
+            block = self._blocks[index]
+            if self.sort_key(block[pos]) == self.sort_key(row):
+                block[pos] = row
+            else:
+                stale.append(index)
+                stale.append(self._insert_block(row))
+        for row in inserted:
+            stale.append(self._insert_block(row))
+            self.total += 1
+
+        stale = [index for index in stale if index is not None]
+        if stale:
+            first_stale = min(stale)
+            for index in [i for i in self._blocks if i >= first_stale]:
+                del self._blocks[index]
+        self._render()
+
+    # Data access
+    def _locate(self, key):
+        for index, block in self._blocks.items():
+            for pos, row in enumerate(block):
+                if row[self.key_index] == key:
+                    return index, pos
+        return None
+
+    def _precedes(self, a, b):
+        if self.descending:
+            return self.sort_key(a) > self.sort_key(b)
+        return self.sort_key(a) < self.sort_key(b)
+
+    def _insert_block(self, row):
+        # The first cached block the row lands in or before; None when the
+        # row sorts after everything cached (no cached offsets move).
+        for index in sorted(self._blocks):
+            block = self._blocks[index]
+            if len(block) < self.block_size or self._precedes(row, block[-1]):
+                return index
+        return None
+
+    def _block(self, index):
+        # None while the block is being fetched.
+        rows = self._blocks.get(index)
+        if rows is None and index not in self._pending:
+            previous = self._blocks.get(index - 1)
+            args = (index * self.block_size, self.block_size,
+                    previous[-1] if previous else None)
+            if self.submit is None:
+                rows = self._store(index, self.fetch(*args))
+            else:
+                self._pending.add(index)
+                generation = self._generation
+                self.submit(self._fetch_if_wanted, generation, index, *args,
+                            on_success=lambda rows: self._on_fetched(generation, index, rows))
+        return rows
+
+    def _store(self, index, rows):
+        self._blocks[index] = rows
+        self._evict(index)
+        return rows
+
+    def _forget_pending(self):
+        self._pending.clear()
+        self._generation += 1
+
+    # Runs on the submit() thread.
+    def _fetch_if_wanted(self, generation, index, offset, limit, previous):
+        if generation != self._generation or not self._wanted(index):
+            return None
+        return self.fetch(offset, limit, previous)
+
+    def _wanted(self, index):
+        start = index * self.block_size
+        return start < self.first + self.visible and self.first < start + self.block_size
+
+    def _on_fetched(self, generation, index, rows):
+        if generation != self._generation:
+            return
+        self._pending.discard(index)
+        if rows is not None:
+            self._store(index, rows)
+        # A skipped block may be back in view by now.
+        self._render()
+
+    def _evict(self, keep):
+        while len(self._blocks) > self.max_blocks:
+            farthest = max(self._blocks, key=lambda i: abs(i - keep))
+            del self._blocks[farthest]
+
+    def _rows(self, start, stop):
+        # Rows of blocks still being fetched are None.
+        rows = []
+        for index in range(start // self.block_size, (stop - 1) // self.block_size + 1):
+            block = self._block(index)
+            lo = max(start - index * self.block_size, 0)
+            hi = min(stop - index * self.block_size, self.block_size)
+            rows.extend(block[lo:hi] if block is not None else [None] * (hi - lo))
+        return rows
+
+    # Rendering
+    def _render(self):
+        self.first = max(0, min(self.first, self.total - self.visible))
+        stop = min(self.first + self.visible, self.total)
+        rows = self._rows(self.first, stop) if stop > self.first else []
+
+        self.tree.delete(*self.tree.get_children())
+        for position, row in enumerate(rows, self.first):
+            if row is None:
+                self.tree.insert('', tk.END, iid=f'{PENDING}{position}',
+                                 values=('Loading...',), tags=('pending',))
+                continue
+            iid = str(row[self.key_index])
+            # Rows can shift between cached blocks when the table changes
+            # underneath us; never let that surface as a duplicate item.
+            if not self.tree.exists(iid):
+                self.tree.insert('', tk.END, iid=iid, values=row)
+        shown = [iid for iid in self.tree.get_children() if iid in self._selected]
+        self.tree.selection_set(shown)
+
+        if self.total:
+            self.vsb.set(self.first / self.total, stop / self.total)
+        else:
+            self.vsb.set(0, 1)
+
+    def _scroll_to(self, first):
+        first = max(0, min(first, self.total - self.visible))
+        if first != self.first:
+            self.first = first
+            self._render()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self.first + rows)
+
+    # Event handlers
+    def _on_resize(self, event):
+        # One row's worth of height is taken by the heading.
+        visible = max(1, event.height // self.row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            self._scroll_to(int(float(args[0]) * self.total))
+        elif action == 'scroll':
+            amount, unit = int(args[0]), args[1]
+            self._scroll_by(amount * (self.visible if unit == 'pages' else 1))
+
+    def _on_mousewheel(self, event):
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def _on_select(self, event):
+        # The selection is remembered by key, so it survives being scrolled
+        # out of view (which empties the Treeview's own selection).  _render()
+        # reselects every remembered row it shows, so a shown row missing
+        # from the selection was deselected by the user.
+        selected = {iid for iid in self.tree.selection() if not iid.startswith(PENDING)}
+        self._selected = selected or {iid for iid in self._selected
+                                      if not self.tree.exists(iid)}
+
+    def _on_arrow(self, step):
+        children = self.tree.get_children()
+        if not children:
+            return None
+        edge = children[0] if step < 0 else children[-1]
+        if self.tree.focus() != edge:
+            return None
+        self._scroll_by(step)
+        children = self.tree.get_children()
+        target = children[0] if step < 0 else children[-1]
+        self.tree.focus(target)
+        self.tree.selection_set(target)
+        return 'break'
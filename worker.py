@@ -0,0 +1,114 @@
+"""Run data-layer calls off the Tk event thread."""
+import queue
+import sys
+import threading
+import traceback
+
+
+class DBWorker:
+    """A single background thread that executes submitted calls in order.
+
+    Results are handed back on the Tk thread: the worker only fills a
+    queue, which the Tk side drains with ``root.after`` while requests are
+    pending.  One thread keeps writes and the refreshes that follow them
+    in submission order.
+    """
+
+    def __init__(self, root, on_error=None, on_busy=None, poll_ms=20):
+        self.root = root
+        self.on_error = on_error
+        self.on_busy = on_busy
+        self.poll_ms = poll_ms
+        self.pending = 0
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._polling = False
+        self._thread = threading.Thread(target=self._run, name='db-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, on_success=None, on_error=None):
+        """Queue fn(*args); must be called from the Tk thread."""
+        self.pending += 1
+        if self.pending == 1 and self.on_busy:
+            self.on_busy(True)
+        self._requests.put((fn, args, on_success, on_error or self.on_error))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self, timeout=5.0):
+        self._requests.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            fn, args, on_success, on_error = request
+            try:
+                self._results.put((on_success, fn(*args), None))
+            except Exception as e:
+                self._results.put((on_error, None, e))
+
+    def _poll(self):
+        while True:
+            try:
+                callback, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            try:
+                if error is None:
+                    if callback:
+                        callback(result)
+                elif callback:
+                    callback(error)
+                else:
+                    raise error
+            except Exception:
+                # Keep polling; report the way Tk reports callback errors.
+                self.root.report_callback_exception(*sys.exc_info())
+        if self.pending == 0 and self.on_busy:
+            self.on_busy(False)
+        if self.pending:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+
+class PeriodicTask(threading.Thread):
+    """Calls fn() every ``interval`` seconds on its own thread until stopped.
+
+    For housekeeping that should neither hold up startup nor queue behind
+    the DB worker.  The first call comes ``delay`` seconds after start()
+    (one interval by default).  An exception goes to on_error(exception),
+    or is printed, and the next call still happens on schedule.
+    """
+
+    def __init__(self, fn, interval, delay=None, on_error=None, name='db-periodic'):
+        super().__init__(name=name, daemon=True)
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.fn = fn
+        self.interval = interval
+        self.delay = interval if delay is None else delay
+        self.on_error = on_error
+        self._stopping = threading.Event()
+
+    def run(self):
+        wait = self.delay
+        while not self._stopping.wait(wait):
+            wait = self.interval
+            try:
+                self.fn()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+                else:
+                    traceback.print_exc()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,127 @@
+"""A single writer thread that commits concurrent sales together (group commit).
+
+Each commit waits for the disk, so with every sale committing on its own
+throughput is capped by the fsync rate.  WriteQueue.sell() requests that
+arrive within ``window_ms`` of each other, up to ``max_batch``, are written
+by main.process_sale_group() in one transaction; every caller still gets
+its own (success, message) result.
+"""
+import concurrent.futures
+import queue
+import threading
+import time
+
+import db
+import main as app
+
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 64
+
+_STOP = object()
+
+
+class WriteQueue(threading.Thread):
+    """Runs writes in order on one thread and one connection.
+
+    The data functions take their connection from db.connection(), which
+    hands a nested caller the connection its thread already holds, so
+    holding one here for the thread's lifetime pins every write to it.
+    Sales queued back to back are coalesced; any other call is run on its
+    own, after the sales queued before it.
+    """
+
+    def __init__(self, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH):
+        super().__init__(name='db-writer', daemon=True)
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.sales = 0
+        self._last_batch = 0
+        self._commit_time = 0.0
+        self._jobs = queue.Queue()
+
+    def submit(self, fn, *args):
+        """Queue fn(*args); returns a concurrent.futures.Future."""
+        future = concurrent.futures.Future()
+        self._jobs.put((future, fn, args))
+        return future
+
+    def sell(self, product_id, quantity_sold):
+        """Queue a single-line sale; the Future resolves to (success, message)."""
+        future = concurrent.futures.Future()
+        self._jobs.put((future, None, (product_id, quantity_sold)))
+        return future
+
+    def stop(self, timeout=5.0):
+        self._jobs.put(_STOP)
+        self.join(timeout)
+
+    def run(self):
+        with db.connection() as conn:
+            following = None
+            while True:
+                job = following or self._jobs.get()
+                following = None
+                if job is _STOP:
+                    break
+                if job[1] is None:
+                    following = self._run_sales(conn, job)
+                else:
+                    self._run_call(conn, job)
+
+    def _run_call(self, conn, job):
+        future, fn, args = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            # Never carry a failed call's transaction into the next.
+            if conn.in_transaction:
+                conn.rollback()
+
+    def _run_sales(self, conn, first):
+        # Collect sales until the window closes or the batch is full; hand
+        # back the first job that is not a sale so it runs next.  The window
+        # is only held open while sales are actually arriving together (so a
+        # lone register does not wait on every sale), and never for longer
+        # than a commit takes, which is all that waiting can save.
+        batch = [first]
+        wait = min(self.window, self._commit_time) if self._last_batch > 1 else 0
+        deadline = time.perf_counter() + wait
+        following = None
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                job = self._jobs.get(timeout=remaining) if remaining > 0 else self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP or job[1] is not None:
+                following = job
+                break
+            batch.append(job)
+
+        self._last_batch = len(batch)
+        batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+        if not batch:
+            return following
+        started = time.perf_counter()
+        try:
+            results = app.process_sale_group([job[2] for job in batch])
+        except Exception as e:
+            for future, _, _ in batch:
+                future.set_exception(e)
+        else:
+            for (future, _, _), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.sales += len(batch)
+            self._commit_time = time.perf_counter() - started
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+        return following